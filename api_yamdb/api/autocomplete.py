@@ -0,0 +1,206 @@
+"""Автодополнение названий произведений, жанров и категорий.
+
+Названия держатся в памяти процесса в отсортированных массивах
+нормализованных ключей, и подсказки находятся двоичным поиском без
+обращения к БД. Для каждого названия есть ключ целиком и ключи с
+каждого следующего слова, поэтому «войны» находит «Звёздные войны»;
+совпадения с начала названия идут первыми.
+
+Индекс строится в фоне при старте процесса (см. wsgi.py и asgi.py).
+Изменения Title, Genre и Category, сделанные в этом процессе, сигналы
+вносят в индекс сразу вставкой и удалением ключей. Об изменениях в
+других процессах говорит версия каталога: тогда индекс пересобирается
+в фоне, а подсказки до конца пересборки идут из прежнего.
+"""
+import threading
+from bisect import bisect_left
+
+from django.db import connections
+
+from api_yamdb.versions import CATALOG, get_version
+from reviews.models import Category, Genre, Title
+from reviews.search import TOKEN_RE, normalize_text
+
+
+def normalize_key(text):
+    return ' '.join(TOKEN_RE.findall(normalize_text(text)))
+
+
+class PrefixIndex:
+    """Поиск по префиксу в отсортированных ключах (bisect).
+
+    Ключи названия целиком и ключи со следующих слов лежат в разных
+    группах: вторые просматриваются только после первых.
+    """
+
+    FULL, INNER = 0, 1
+
+    def __init__(self, items=()):
+        """items — тройки (название, идентификатор, данные для ответа)."""
+        self.keys_by_ident = {}
+        groups = ([], [])
+        for name, ident, payload in items:
+            keys = self.split_keys(name)
+            if keys:
+                self.keys_by_ident[ident] = keys
+            for group, key in keys:
+                groups[group].append((key, ident, payload))
+        self.groups = []
+        for entries in groups:
+            entries.sort(key=lambda entry: entry[:2])
+            self.groups.append(
+                ([entry[0] for entry in entries], entries)
+            )
+
+    @classmethod
+    def split_keys(cls, name):
+        """Пары (группа, ключ) для названия."""
+        words = normalize_key(name).split(' ')
+        if not words[0]:
+            return []
+        return [
+            (cls.INNER if position else cls.FULL, ' '.join(words[position:]))
+            for position in range(len(words))
+        ]
+
+    def add(self, name, ident, payload):
+        """Добавляет или заменяет название с идентификатором ident."""
+        self.remove(ident)
+        keys = self.split_keys(name)
+        if keys:
+            self.keys_by_ident[ident] = keys
+        for group, key in keys:
+            group_keys, entries = self.groups[group]
+            position = bisect_left(entries, (key, ident))
+            group_keys.insert(position, key)
+            entries.insert(position, (key, ident, payload))
+
+    def remove(self, ident):
+        for group, key in self.keys_by_ident.pop(ident, ()):
+            group_keys, entries = self.groups[group]
+            position = bisect_left(entries, (key, ident))
+            del group_keys[position]
+            del entries[position]
+
+    def search(self, prefix, limit):
+        results = []
+        seen = set()
+        for keys, entries in self.groups:
+            position = bisect_left(keys, prefix)
+            while (
+                position < len(keys)
+                and len(results) < limit
+                and keys[position].startswith(prefix)
+            ):
+                _, ident, payload = entries[position]
+                if ident not in seen:
+                    seen.add(ident)
+                    results.append(payload)
+                position += 1
+        return results
+
+
+class CatalogAutocomplete:
+
+    # Имя группы в ответе: модель и поле-идентификатор
+    SOURCES = (
+        ('titles', Title, 'id'),
+        ('genres', Genre, 'slug'),
+        ('categories', Category, 'slug'),
+    )
+
+    def __init__(self):
+        # lock защищает индексы от чтения во время вставки и удаления,
+        # build_lock не даёт запустить две пересборки сразу
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.version = None
+        self.indexes = None
+
+    @staticmethod
+    def entry(ident_field, pk, ident, name):
+        # В индексе объект определяется pk: slug может смениться
+        return name, pk, {ident_field: ident, 'name': name}
+
+    def build(self):
+        indexes = {}
+        for group, model, ident_field in self.SOURCES:
+            values = model.objects.order_by().values_list(
+                'pk', ident_field, 'name'
+            )
+            indexes[group] = PrefixIndex(
+                self.entry(ident_field, *row) for row in values.iterator()
+            )
+        return indexes
+
+    def rebuild(self):
+        """Строит индексы заново и подменяет ими текущие."""
+        with self.build_lock:
+            # Версия берётся до чтения БД: изменения, пропущенные
+            # сборкой, поменяют её ещё раз и вызовут новую пересборку
+            version = get_version(CATALOG)
+            if version == self.version:
+                return
+            indexes = self.build()
+            with self.lock:
+                self.indexes = indexes
+                self.version = version
+
+    def rebuild_in_background(self):
+        if self.build_lock.locked():
+            # Следующий запрос после окончания пересборки снова сверит
+            # версию
+            return
+        threading.Thread(target=self.run_rebuild, daemon=True).start()
+
+    def run_rebuild(self):
+        try:
+            self.rebuild()
+        finally:
+            connections.close_all()
+
+    def warm_up(self):
+        """Запускает построение индекса, не дожидаясь первого запроса."""
+        self.rebuild_in_background()
+
+    def get_indexes(self):
+        if self.indexes is None:
+            # Прогрев ещё не закончился: первый запрос ждёт построения
+            self.rebuild()
+        elif get_version(CATALOG) != self.version:
+            self.rebuild_in_background()
+        return self.indexes
+
+    def find_source(self, instance):
+        for group, model, ident_field in self.SOURCES:
+            if isinstance(instance, model):
+                return group, ident_field
+        raise LookupError(type(instance).__name__)
+
+    def update(self, instance):
+        group, ident_field = self.find_source(instance)
+        name, pk, payload = self.entry(
+            ident_field, instance.pk, getattr(instance, ident_field),
+            instance.name,
+        )
+        with self.lock:
+            if self.indexes is not None:
+                self.indexes[group].add(name, pk, payload)
+
+    def remove(self, instance):
+        group, _ = self.find_source(instance)
+        with self.lock:
+            if self.indexes is not None:
+                self.indexes[group].remove(instance.pk)
+
+    def search(self, query, limit):
+        prefix = normalize_key(query)
+        indexes = self.get_indexes()
+        with self.lock:
+            return {
+                group: indexes[group].search(prefix, limit) if prefix else []
+                for group, _, _ in self.SOURCES
+            }
+
+
+catalog_autocomplete = CatalogAutocomplete()
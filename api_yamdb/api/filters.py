@@ -1,16 +1,125 @@
 import django_filters
+from django import forms
+from django.db.models import Count
 
-from reviews.models import Title
+from reviews.models import Comment, Review, Title
+from reviews.search import comment_index, review_index, title_index
+
+
+class TitleFilterForm(forms.Form):
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('genre_mode') and not cleaned_data.get('genre'):
+            self.add_error(
+                'genre_mode', 'Режим задаётся только вместе с genre.'
+            )
+        return cleaned_data
 
 
 class TitleFilter(django_filters.FilterSet):
+    GENRE_MODE_ANY = 'any'
+    GENRE_MODE_ALL = 'all'
+    GENRE_MODES = (
+        (GENRE_MODE_ANY, 'Хотя бы один из жанров'),
+        (GENRE_MODE_ALL, 'Все перечисленные жанры'),
+    )
+
     name = django_filters.CharFilter(
         field_name='name', lookup_expr='icontains'
     )
     year = django_filters.NumberFilter(field_name='year')
-    genre = django_filters.CharFilter(field_name='genre__slug')
+    year_min = django_filters.NumberFilter(
+        field_name='year', lookup_expr='gte'
+    )
+    year_max = django_filters.NumberFilter(
+        field_name='year', lookup_expr='lte'
+    )
+    # Рейтинг хранится в Title, поэтому фильтр не требует агрегации
+    rating_min = django_filters.NumberFilter(
+        field_name='rating', lookup_expr='gte'
+    )
+    rating_max = django_filters.NumberFilter(
+        field_name='rating', lookup_expr='lte'
+    )
+    # genre=drama,comedy; genre_mode=all требует все жанры сразу
+    genre = django_filters.CharFilter(method='filter_genre')
+    genre_mode = django_filters.ChoiceFilter(
+        choices=GENRE_MODES, method='filter_genre_mode'
+    )
     category = django_filters.CharFilter(field_name='category__slug')
+    # Полнотекстовый поиск по названию и описанию, результаты идут по
+    # убыванию релевантности
+    search = django_filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Title
-        fields = ['name', 'year', 'genre', 'category']
+        form = TitleFilterForm
+        fields = [
+            'name', 'year', 'year_min', 'year_max', 'rating_min',
+            'rating_max', 'genre', 'genre_mode', 'category', 'search',
+        ]
+
+    def filter_genre(self, queryset, name, value):
+        """Жанры проверяются полусоединением pk IN (SELECT title_id ...).
+
+        В отличие от JOIN по genre__slug, строки произведений не
+        размножаются, и DISTINCT не нужен. Для режима «все жанры»
+        подзапрос группирует связи по произведению и оставляет те, где
+        нашлись все жанры: один подзапрос при любом числе жанров вместо
+        подзапроса на каждый жанр. Группировка обходится дороже, чем
+        цепочка JOIN, поэтому на двух-трёх жанрах такой запрос может быть
+        медленнее; зато он не растёт с числом жанров в фильтре.
+        """
+        slugs = {slug.strip() for slug in value.split(',') if slug.strip()}
+        if not slugs:
+            return queryset
+        title_genres = Title.genre.through.objects.filter(
+            genre__slug__in=slugs
+        ).values('title_id')
+        if self.form.cleaned_data.get('genre_mode') == self.GENRE_MODE_ALL:
+            title_genres = title_genres.annotate(
+                genres_found=Count('genre_id', distinct=True)
+            ).filter(genres_found=len(slugs)).values('title_id')
+        return queryset.filter(pk__in=title_genres)
+
+    def filter_genre_mode(self, queryset, name, value):
+        # Режим только уточняет фильтр genre
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return title_index.filter(queryset, value)
+
+
+class TextSearchFilter(django_filters.FilterSet):
+    """Обязательный полнотекстовый запрос ``q`` по индексу search_index."""
+
+    search_index = None
+
+    q = django_filters.CharFilter(method='filter_text', required=True)
+
+    def filter_text(self, queryset, name, value):
+        return queryset.filter(self.search_index.match(value))
+
+
+class ReviewSearchFilter(TextSearchFilter):
+    search_index = review_index
+
+    title = django_filters.NumberFilter(field_name='title_id')
+    author = django_filters.CharFilter(field_name='author__username')
+
+    class Meta:
+        model = Review
+        fields = ['q', 'title', 'author']
+
+
+class CommentSearchFilter(TextSearchFilter):
+    search_index = comment_index
+
+    title = django_filters.NumberFilter(field_name='review__title_id')
+    review = django_filters.NumberFilter(field_name='review_id')
+    author = django_filters.CharFilter(field_name='author__username')
+
+    class Meta:
+        model = Comment
+        fields = ['q', 'title', 'review', 'author']
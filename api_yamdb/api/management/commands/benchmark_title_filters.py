@@ -0,0 +1,133 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+
+from api.filters import TitleFilter
+from reviews.models import Category, Genre, Title
+
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark TitleFilter on a synthetic catalog against the old '
+        'JOIN + DISTINCT query shapes. Data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--titles', type=int, default=50000,
+            help='Number of synthetic titles',
+        )
+        parser.add_argument(
+            '--genres', type=int, default=30,
+            help='Number of synthetic genres',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Runs per query, the best time is reported',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Random seed for the synthetic catalog',
+        )
+        parser.add_argument(
+            '--explain', action='store_true', help='Print query plans'
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.explain = options['explain']
+        with transaction.atomic():
+            genres = self.create_catalog(
+                options['titles'], options['genres'], options['seed']
+            )
+            first, second = genres[0].slug, genres[1].slug
+            for label, params, legacy in (
+                (
+                    'genre any-of', f'genre={first},{second}',
+                    Title.objects.filter(
+                        genre__slug__in=[first, second]
+                    ).distinct(),
+                ),
+                (
+                    'genre all-of',
+                    f'genre={first},{second}&genre_mode=all',
+                    Title.objects.filter(genre__slug=first).filter(
+                        genre__slug=second
+                    ).distinct(),
+                ),
+                ('year range', 'year_min=1990&year_max=1999', None),
+                ('rating range', 'rating_min=7&rating_max=9', None),
+                (
+                    'combined',
+                    f'genre={first},{second}&year_min=1980&rating_min=5',
+                    None,
+                ),
+            ):
+                queryset = TitleFilter(
+                    QueryDict(params), queryset=Title.objects.order_by('name')
+                ).qs
+                self.report(label, queryset, legacy)
+            transaction.set_rollback(True)
+
+    def create_catalog(self, titles, genres, seed):
+        rng = random.Random(seed)
+        category = Category.objects.create(
+            name='Бенчмарк', slug='benchmark-title-filters'
+        )
+        genres = Genre.objects.bulk_create(
+            Genre(name=f'Жанр {number}', slug=f'benchmark-{number}')
+            for number in range(genres)
+        )
+        created = Title.objects.bulk_create(
+            (
+                Title(
+                    name=f'Произведение {number:07}',
+                    year=rng.randint(1900, 2024),
+                    category=category,
+                    rating=round(rng.uniform(1, 10), 2),
+                )
+                for number in range(titles)
+            ),
+            batch_size=1000,
+        )
+        Title.genre.through.objects.bulk_create(
+            (
+                Title.genre.through(title_id=title.pk, genre_id=genre.pk)
+                for title in created
+                for genre in rng.sample(genres, rng.randint(1, 4))
+            ),
+            batch_size=1000,
+        )
+        self.stdout.write(
+            f'Catalog: {titles} titles, {len(genres)} genres'
+        )
+        return genres
+
+    def measure(self, queryset):
+        """Лучшее время COUNT и первой страницы, в миллисекундах."""
+        best = None
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            count = queryset.count()
+            list(queryset.order_by('name')[:PAGE_SIZE])
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return count, best
+
+    def report(self, label, queryset, legacy):
+        count, elapsed = self.measure(queryset)
+        line = f'{label:<14} {count:>8} rows  {elapsed:8.2f} ms'
+        if legacy is not None:
+            legacy_count, legacy_elapsed = self.measure(legacy)
+            line += (
+                f'  (JOIN + DISTINCT: {legacy_elapsed:8.2f} ms'
+                f'{"" if legacy_count == count else ", COUNT DIFFERS"})'
+            )
+        self.stdout.write(line)
+        if self.explain:
+            self.stdout.write(queryset.order_by('name').explain())
@@ -0,0 +1,328 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from api_yamdb.singleflight import single_flight
+from api_yamdb.versions import get_versions
+
+
+class LocalCache:
+    """Небольшой LRU-кэш в памяти процесса.
+
+    Ключи содержат версии коллекций, поэтому после изменения коллекции
+    устаревшие записи не читаются и лишь вытесняются новыми. Записи живут
+    не дольше timeout секунд: если версия в общем кэше потерялась или
+    кэш не общий, процесс всё равно не отдаёт старые данные бесконечно.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            expires, value = self.items.get(key, (None, None))
+            if value is None:
+                return None
+            if expires <= time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+local_cache = LocalCache(
+    settings.LOCAL_CACHE_MAX_SIZE, settings.LIST_CACHE_TIMEOUT
+)
+
+
+def normalized_query(request, ignored=(), allowed=None):
+    """Хэш параметров запроса, не зависящий от их порядка.
+
+    Если задан allowed, учитываются только перечисленные параметры.
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        if key not in ignored and (allowed is None or key in allowed)
+        for value in values
+    )
+    return hashlib.md5(urlencode(params).encode()).hexdigest()
+
+
+def request_origin(request):
+    """Схема и хост запроса: из них строятся абсолютные ссылки ответа."""
+    return f'{request.scheme}://{request.get_host()}'
+
+
+def filter_link_params(url, allowed):
+    """Оставляет в ссылке только параметры из allowed."""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key in allowed
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def cached_response(key, handler, request, *args, **kwargs):
+    """Ответ из памяти процесса, общего кэша или от handler.
+
+    Пересборку по одному ключу выполняет один запрос во всех процессах
+    (см. api_yamdb.singleflight); кэшируются только ответы 200.
+    """
+    data = local_cache.get(key)
+    if data is not None:
+        return Response(data)
+    response = None
+
+    def build():
+        nonlocal response
+        response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return None
+        return response.data
+
+    data = single_flight.get_or_build(key, build, settings.LIST_CACHE_TIMEOUT)
+    if response is not None:
+        if data is not None:
+            local_cache.set(key, data)
+        return response
+    local_cache.set(key, data)
+    return Response(data)
+
+
+class CachedListMixin:
+    """Кэширует ответ list в памяти процесса и в общем кэше Django.
+
+    Ключ строится из версий коллекций ``list_cache_versions``, схемы и
+    хоста (они попадают в ссылки пагинации) и всех параметров запроса,
+    поэтому изменение любой из коллекций сразу делает закэшированные
+    ответы недоступными во всех процессах.
+    """
+
+    list_cache_versions = ()
+
+    def get_list_cache_key(self, request):
+        versions = get_versions(*self.list_cache_versions)
+        return (
+            f'list:{self.basename}:{versions}:{request_origin(request)}:'
+            f'{normalized_query(request)}'
+        )
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            self.get_list_cache_key(request),
+            super().list, request, *args, **kwargs
+        )
+
+
+class AnonymousResponseCacheMixin:
+    """Кэширует ответы list и retrieve для анонимных запросов.
+
+    Ответы одинаковы для всех анонимных пользователей, поэтому ключ
+    строится только из версий ``response_cache_versions``, схемы и хоста,
+    id объекта и параметров из ``response_cache_params`` (фильтры и
+    пагинация). Прочие параметры (например, utm_*) в ключ не попадают и
+    убираются из ссылок next/previous, чтобы ответ одного клиента не
+    разносил их остальным. Одновременные промахи по одному ключу
+    схлопываются (см. cached_response).
+    """
+
+    response_cache_versions = ()
+    response_cache_params = ()
+    response_cache_actions = ('list', 'retrieve')
+
+    def get_response_cache_key(self, request):
+        versions = '-'.join(
+            map(str, get_versions(*self.response_cache_versions))
+        )
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        query = normalized_query(request, allowed=self.response_cache_params)
+        return (
+            f'response:{self.basename}:{self.action}:{versions}:'
+            f'{request_origin(request)}:{lookup}:{query}'
+        )
+
+    def get_cacheable_response(self, handler, request, *args, **kwargs):
+        response = handler(request, *args, **kwargs)
+        data = response.data
+        if response.status_code == 200 and isinstance(data, dict):
+            for link in ('next', 'previous'):
+                if link in data:
+                    data[link] = filter_link_params(
+                        data[link], self.response_cache_params
+                    )
+        return response
+
+    def use_response_cache(self, request):
+        return (
+            self.action in self.response_cache_actions
+            and not request.user.is_authenticated
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return super().list(request, *args, **kwargs)
+        return cached_response(
+            self.get_response_cache_key(request),
+            partial(self.get_cacheable_response, super().list),
+            request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            self.get_response_cache_key(request),
+            partial(self.get_cacheable_response, super().retrieve),
+            request, *args, **kwargs
+        )
+
+
+class NotModified(Exception):
+    """Прерывает обработку запроса готовым ответом 304."""
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list и retrieve по версиям коллекций.
+
+    Валидаторы считаются из версий ``conditional_versions``, адреса и
+    параметров запроса, а не из тела ответа, поэтому на 304 не тратится
+    ни запрос к БД за данными, ни сериализация.
+
+    Last-Modified точен до секунды, поэтому он отдаётся и проверяется,
+    только когда секунда последнего изменения уже прошла: иначе запись в
+    ту же секунду не изменила бы заголовок и клиент получил бы 304 на
+    устаревшие данные. В текущей секунде работает только ETag.
+    """
+
+    conditional_versions = ()
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validators(self, request):
+        versions = get_versions(*self.conditional_versions)
+        raw = (
+            f'{self.basename}:{versions}:{request_origin(request)}:'
+            f'{request.path}:{normalized_query(request)}:'
+            f'{request.accepted_media_type}'
+        )
+        etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+        last_modified = max(versions) // 10 ** 9
+        if last_modified >= int(time.time()):
+            last_modified = None
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+        if (
+            request.method not in ('GET', 'HEAD')
+            or self.action not in self.conditional_actions
+        ):
+            return
+        self.conditional_validators = self.get_validators(request)
+        etag, last_modified = self.conditional_validators
+        response = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code == 200:
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class NestedResourceMixin:
+    """Вложенный ресурс: отзывы произведения, комментарии к отзыву.
+
+    parent_lookups сопоставляет поля родителя с параметрами URL, ключ
+    'pk' задаёт его первичный ключ. Объекты фильтруются по id родителя
+    без его загрузки; существование родителя проверяется одним запросом
+    и только там, где без этого не обойтись: при создании и когда
+    страница списка пуста. Непустая страница уже доказывает, что родитель
+    есть. Результат проверки запоминается на представлении до конца
+    запроса.
+    """
+
+    parent_model = None
+    parent_field = None
+    parent_lookups = {'pk': 'pk'}
+
+    def get_parent_lookups(self):
+        return {
+            field: self.kwargs[kwarg]
+            for field, kwarg in self.parent_lookups.items()
+        }
+
+    def get_parent_id(self):
+        return self.kwargs[self.parent_lookups['pk']]
+
+    def check_parent_exists(self):
+        if getattr(self, '_parent_exists', None) is None:
+            self._parent_exists = self.parent_model.objects.filter(
+                **self.get_parent_lookups()
+            ).exists()
+        if not self._parent_exists:
+            raise Http404
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{
+            f'{self.parent_field}__{field}': value
+            for field, value in self.get_parent_lookups().items()
+        })
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if not page:
+            self.check_parent_exists()
+        return page
+
+    def save_with_parent(self, serializer, **kwargs):
+        self.check_parent_exists()
+        return serializer.save(
+            **{f'{self.parent_field}_id': self.get_parent_id()}, **kwargs
+        )
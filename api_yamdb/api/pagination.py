@@ -0,0 +1,240 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api_yamdb.versions import get_versions
+
+from .mixins import normalized_query
+
+
+class PubDateKeysetPagination(CursorPagination):
+    """Курсорная пагинация по (pub_date, id) без OFFSET и COUNT(*).
+
+    Позиция курсора хранит и дату, и id крайнего объекта страницы, поэтому
+    она уникальна: объекты с одинаковой pub_date (например, после
+    load_data) листаются условием по id, а не смещением, как в
+    CursorPagination.
+    """
+
+    ordering = ('-pub_date', '-id')
+    position_separator = '|'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_condition(position, reverse)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > self.page_size:
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = following_position is not None
+            self.next_position = position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = position is not None
+            self.next_position = following_position
+            self.previous_position = position
+        if self.has_previous or self.has_next:
+            self.display_page_controls = True
+        return self.page
+
+    def get_position_condition(self, position, reverse):
+        """Объекты строго после позиции в порядке обхода."""
+        pub_date, _, pk = position.rpartition(self.position_separator)
+        try:
+            pub_date = parse_datetime(pub_date)
+        except ValueError:
+            pub_date = None
+        if pub_date is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'gt' if reverse else 'lt'
+        return Q(**{f'pub_date__{lookup}': pub_date}) | Q(
+            pub_date=pub_date, **{f'id__{lookup}': int(pk)}
+        )
+
+    def _get_position_from_instance(self, instance, ordering):
+        return (
+            f'{instance.pub_date.isoformat()}'
+            f'{self.position_separator}{instance.pk}'
+        )
+
+
+class ReviewCommentPagination(PageNumberPagination):
+    """Постраничная пагинация с опциональным курсорным режимом.
+
+    По умолчанию ответ совпадает с глобальной PageNumberPagination.
+    С параметром ``?pagination=cursor`` страницы отдаются по курсору,
+    и каждая страница стоит одинаково, как бы глубоко она ни была.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def __init__(self):
+        self.keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == self.cursor_mode:
+            self.keyset_paginator = PubDateKeysetPagination()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.keyset_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт общее количество объектов из кэша."""
+
+    def __init__(self, object_list, per_page, count_cache_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.count_cache_key)
+        if count is None:
+            count = super().count
+            cache.set(
+                self.count_cache_key,
+                count,
+                settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+            )
+        return count
+
+
+class CatalogPagination(PageNumberPagination):
+    """Постраничная пагинация без COUNT(*) на каждый запрос.
+
+    Количество объектов кэшируется по нормализованным параметрам фильтра
+    и версиям коллекций из ``count_versions`` вьюсета (или его метода
+    ``get_count_versions(request)``), поэтому после любого изменения
+    коллекции оно пересчитывается. С ``?count=false``
+    количество не считается вовсе: страница читается с одним лишним
+    объектом, чтобы понять, есть ли следующая, а ``count`` равен null.
+    """
+
+    count_query_param = 'count'
+    # Параметры, не влияющие на количество объектов
+    page_query_params = ('page', 'page_size', 'count', 'pagination')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count_free = (
+            request.query_params.get(self.count_query_param, '').lower()
+            in ('false', '0')
+        )
+        if self.count_free:
+            return self.paginate_without_count(queryset, request)
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            count_cache_key=self.get_count_cache_key(request, view),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_cache_key(self, request, view):
+        versions = '-'.join(
+            map(str, get_versions(*self.get_count_versions(request, view)))
+        )
+        query = normalized_query(request, ignored=self.page_query_params)
+        return f'count:{view.basename}:{versions}:{query}'
+
+    def get_count_versions(self, request, view):
+        # Вьюсет может уточнить версии по параметрам запроса
+        get_count_versions = getattr(view, 'get_count_versions', None)
+        if get_count_versions is None:
+            return view.count_versions
+        return get_count_versions(request)
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(
+                request.query_params.get(self.page_query_param, 1)
+            )
+            if self.page_number < 1:
+                raise InvalidPage
+        except (TypeError, ValueError, InvalidPage):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=request.query_params.get(self.page_query_param),
+                message='Invalid page.',
+            ))
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        if not rows and self.page_number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=self.page_number, message='That page is empty.'
+            ))
+        self.has_next_page = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.count_free:
+            return super().get_next_link()
+        if not self.has_next_page:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+            self.page_number + 1,
+        )
+
+    def get_previous_link(self):
+        if not self.count_free:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.page_query_param, self.page_number - 1
+        )
+
+    def get_paginated_response(self, data):
+        if not self.count_free:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': None,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
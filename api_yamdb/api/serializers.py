@@ -2,10 +2,13 @@ from datetime import datetime
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db.models import Q
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 
 import api_yamdb.constants as constants
+from mdb_users.authentication import add_role_claims
+from mdb_users.tokens import check_confirmation_code
 from reviews.models import Category, Comment, Genre, Review, Title
 
 User = get_user_model()
@@ -28,38 +31,35 @@ class SignUpSerializer(serializers.Serializer):
         return value
 
     def validate(self, data):
-        username = data.get('username')
-        email = data.get('email')
-
-        if username and email:
-            username_exists = User.objects.filter(username=username).exists()
-            email_exists = User.objects.filter(email=email).exists()
-            username_and_email_exists = username_exists and email_exists
-
-            if username_and_email_exists:
-                if not User.objects.filter(username=username,
-                                           email=email
-                                           ).exists():
-                    raise serializers.ValidationError({
-                        'username': constants.USER_USERNAME_OCCUPIED_ERROR,
-                        'email': constants.USER_EMAIL_OCCUPIED_ERROR
-                    })
-            elif username_exists:
-                raise serializers.ValidationError({
-                    'username': constants.USER_USERNAME_OCCUPIED_ERROR
-                })
-            elif email_exists:
-                raise serializers.ValidationError({
-                    'email': constants.USER_EMAIL_OCCUPIED_ERROR
-                })
-
+        """Одним запросом находит пользователей с таким username или email.
+
+        Если есть пользователь ровно с этой парой, он возвращается в
+        data['user'] для повторной отправки кода; любое другое совпадение
+        означает, что username или email заняты.
+        """
+        username = data['username']
+        email = data['email']
+        errors = {}
+        data['user'] = None
+        for user in User.objects.filter(
+            Q(username=username) | Q(email=email)
+        ).order_by()[:2]:
+            if user.username == username and user.email == email:
+                data['user'] = user
+                continue
+            if user.username == username:
+                errors['username'] = constants.USER_USERNAME_OCCUPIED_ERROR
+            if user.email == email:
+                errors['email'] = constants.USER_EMAIL_OCCUPIED_ERROR
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'], email=validated_data['email']
+        return User.objects.create_user(
+            username=validated_data['username'],
+            email=validated_data['email'],
         )
-        return user
 
 
 class TokenSerializer(serializers.Serializer):
@@ -71,16 +71,17 @@ class TokenSerializer(serializers.Serializer):
         confirmation_code = attrs.get('confirmation_code')
 
         try:
-            user = User.objects.get(username=username)
+            user = User.objects.select_related('confirmation').get(
+                username=username
+            )
         except User.DoesNotExist:
             raise serializers.ValidationError(
                 constants.USER_NOT_FOUND_ERROR, code='not_found'
             )
 
-        if user.confirmation_code != confirmation_code:
-            raise serializers.ValidationError(
-                constants.USER_WRONG_CONFIRMATION_CODE_ERROR
-            )
+        error = check_confirmation_code(user, confirmation_code)
+        if error:
+            raise serializers.ValidationError(error)
 
         attrs['user'] = user
         return attrs
@@ -89,10 +90,19 @@ class TokenSerializer(serializers.Serializer):
         user = validated_data['user']
         refresh = RefreshToken.for_user(user)
         return {
-            'token': str(refresh.access_token),
+            'token': str(add_role_claims(refresh.access_token, user)),
         }
 
 
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(allow_blank=True, trim_whitespace=False)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=constants.AUTOCOMPLETE_MAX_LIMIT,
+        default=constants.AUTOCOMPLETE_DEFAULT_LIMIT,
+    )
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -181,7 +191,7 @@ class TitleReadSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'rating')
 
     def get_rating(self, obj):
-        return getattr(obj, 'calculated_rating', None)
+        return obj.rating
 
 
 class TitleWriteSerializer(serializers.ModelSerializer):
@@ -268,19 +278,6 @@ class ReviewSerializer(serializers.ModelSerializer):
             )
         return value
 
-    def validate(self, data):
-        request = self.context.get('request')
-        title_id = self.context.get('view').kwargs.get('title_id')
-
-        if request and request.method == 'POST':
-            if Review.objects.filter(
-                title_id=title_id, author=request.user
-            ).exists():
-                raise serializers.ValidationError(
-                    constants.REVIEW_ALREADY_EXISTS_ERROR
-                )
-        return data
-
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
@@ -291,3 +288,18 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
         read_only_fields = ('id', 'author', 'pub_date')
+
+
+class ReviewSearchSerializer(ReviewSerializer):
+    title = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = (*ReviewSerializer.Meta.fields, 'title')
+
+
+class CommentSearchSerializer(CommentSerializer):
+    review = serializers.PrimaryKeyRelatedField(read_only=True)
+    title = serializers.IntegerField(source='title_id', read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = (*CommentSerializer.Meta.fields, 'review', 'title')
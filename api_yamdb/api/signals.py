@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.autocomplete import catalog_autocomplete
+from reviews.models import Category, Genre, Title
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Category)
+def update_autocomplete(sender, instance, raw=False, **kwargs):
+    if not raw:
+        catalog_autocomplete.update(instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Category)
+def remove_from_autocomplete(sender, instance, **kwargs):
+    catalog_autocomplete.remove(instance)
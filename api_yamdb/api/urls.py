@@ -8,10 +8,17 @@ router.register('users', views.UserViewSet, basename='users')
 router.register('categories', views.CategoryViewSet, basename='categories')
 router.register('genres', views.GenreViewSet, basename='genres')
 router.register('titles', views.TitleViewSet, basename='titles')
+router.register(
+    'search/reviews', views.ReviewSearchViewSet, basename='search-reviews'
+)
+router.register(
+    'search/comments', views.CommentSearchViewSet, basename='search-comments'
+)
 
 urlpatterns = [
     path('v1/auth/signup/', views.signup, name='signup'),
     path('v1/auth/token/', views.token, name='token'),
+    path('v1/autocomplete/', views.autocomplete, name='autocomplete'),
     path('v1/', include(router.urls)),
     # Reviews endpoints
     path(
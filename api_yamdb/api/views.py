@@ -1,22 +1,35 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, permissions, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+import api_yamdb.constants as constants
 from api_yamdb.exceptions import SendConfirmationCodeError
+from api_yamdb.versions import CATALOG, CATEGORIES, GENRES, REVIEWS, USERS
+from mdb_users.authentication import get_model_user
 from mdb_users.permissions import (IsAdmin, IsAdminOrReadOnly,
                                    IsAuthorOrModeratorOrAdmin)
-from mdb_users.tokens import generate_confirmation_code, send_confirmation_code
-from reviews.models import Category, Genre, Review, Title
-
-from .filters import TitleFilter
-from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, ReviewSerializer, SignUpSerializer,
+from mdb_users.tokens import (generate_confirmation_code,
+                              send_confirmation_code, store_confirmation_code)
+from reviews.models import Category, Comment, Genre, Review, Title
+
+from .autocomplete import catalog_autocomplete
+from .filters import CommentSearchFilter, ReviewSearchFilter, TitleFilter
+from .mixins import (AnonymousResponseCacheMixin, CachedListMixin,
+                     ConditionalGetMixin, NestedResourceMixin)
+from .pagination import (CatalogPagination, PubDateKeysetPagination,
+                         ReviewCommentPagination)
+from .serializers import (AutocompleteQuerySerializer, CategorySerializer,
+                          CommentSearchSerializer, CommentSerializer,
+                          GenreSerializer, ReviewSearchSerializer,
+                          ReviewSerializer, SignUpSerializer,
                           TitleReadSerializer, TitleWriteSerializer,
                           TokenSerializer, UserProfileSerializer,
                           UserSerializer)
@@ -24,12 +37,9 @@ from .serializers import (CategorySerializer, CommentSerializer,
 User = get_user_model()
 
 
-def handle_existing_user(user, email):
-    confirmation_code = generate_confirmation_code()
-    user.confirmation_code = confirmation_code
-    user.save()
+def send_code_response(user, confirmation_code):
     try:
-        send_confirmation_code(email, confirmation_code)
+        send_confirmation_code(user.email, confirmation_code)
     except SendConfirmationCodeError as e:
         return Response(
             {'detail': str(e)},
@@ -41,38 +51,51 @@ def handle_existing_user(user, email):
     )
 
 
+def handle_existing_user(user, confirmation_code):
+    store_confirmation_code(user, confirmation_code)
+    return send_code_response(user, confirmation_code)
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def signup(request):
     serializer = SignUpSerializer(data=request.data)
-    if serializer.is_valid():
-        username = serializer.validated_data['username']
-        email = serializer.validated_data['email']
-
-        user = User.objects.filter(username=username, email=email).first()
-        if user:
-            return handle_existing_user(user, email)
-
-        user = serializer.save()
-        confirmation_code = generate_confirmation_code()
-        user.confirmation_code = confirmation_code
-        user.save()
-        send_confirmation_code(user.email, confirmation_code)
-        return Response(
-            {'username': user.username, 'email': user.email},
-            status=status.HTTP_200_OK,
-        )
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    confirmation_code = generate_confirmation_code()
+    user = serializer.validated_data['user']
+    if user:
+        return handle_existing_user(user, confirmation_code)
+    try:
+        with transaction.atomic():
+            user = serializer.save()
+            store_confirmation_code(user, confirmation_code)
+    except IntegrityError:
+        # Параллельный запрос успел занять username или email после
+        # проверки: повторная проверка вернёт ошибку или этого пользователя
+        serializer = SignUpSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        user = serializer.validated_data['user']
+        if user is None:
+            raise
+        return handle_existing_user(user, confirmation_code)
+    return send_code_response(user, confirmation_code)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def token(request):
     serializer = TokenSerializer(data=request.data)
-    if serializer.is_valid():
-        token_data = serializer.save()
-        return Response(token_data, status=status.HTTP_200_OK)
+    # Код гасится при проверке; если токен выдать не удастся, откат
+    # транзакции вернёт код пользователю
+    with transaction.atomic():
+        if serializer.is_valid():
+            token_data = serializer.save()
+            return Response(token_data, status=status.HTTP_200_OK)
     if 'non_field_errors' in serializer.errors:
         for error in serializer.errors['non_field_errors']:
             if hasattr(error, 'code') and error.code == 'not_found':
@@ -82,10 +105,24 @@ def token(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete(request):
+    """Подсказки по началу названия из индекса в памяти, без запросов
+    к БД."""
+    serializer = AutocompleteQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return Response(catalog_autocomplete.search(
+        serializer.validated_data['q'], serializer.validated_data['limit']
+    ))
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
+    pagination_class = CatalogPagination
+    count_versions = (USERS,)
     filter_backends = [SearchFilter]
     search_fields = ['username']
     lookup_field = 'username'
@@ -98,12 +135,14 @@ class UserViewSet(viewsets.ModelViewSet):
         url_path='me',
     )
     def me(self, request):
+        # При чтении request.user может быть собран из claims токена
+        user = get_model_user(request.user)
         if request.method == 'GET':
-            serializer = UserProfileSerializer(request.user)
+            serializer = UserProfileSerializer(user)
             return Response(serializer.data)
         elif request.method == 'PATCH':
             serializer = UserProfileSerializer(
-                request.user, data=request.data, partial=True
+                user, data=request.data, partial=True
             )
             if serializer.is_valid():
                 serializer.save()
@@ -114,6 +153,8 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 class CategoryViewSet(
+    ConditionalGetMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -121,6 +162,8 @@ class CategoryViewSet(
 ):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    list_cache_versions = (CATEGORIES,)
+    conditional_versions = (CATEGORIES,)
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
@@ -133,6 +176,8 @@ class CategoryViewSet(
 
 
 class GenreViewSet(
+    ConditionalGetMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
@@ -140,6 +185,8 @@ class GenreViewSet(
 ):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    list_cache_versions = (GENRES,)
+    conditional_versions = (GENRES,)
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
@@ -151,13 +198,35 @@ class GenreViewSet(
         return super().get_permissions()
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ConditionalGetMixin, AnonymousResponseCacheMixin, viewsets.ModelViewSet
+):
     queryset = Title.objects.all()
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = CatalogPagination
+    count_versions = (CATALOG,)
+    # Параметры, из-за которых число произведений зависит от отзывов
+    rating_filter_params = ('rating_min', 'rating_max')
+    conditional_versions = (CATALOG, REVIEWS)
+    # Рейтинг в ответе зависит от отзывов, остальное — от каталога
+    response_cache_versions = (CATALOG, REVIEWS)
+    response_cache_params = (
+        *TitleFilter.base_filters, *CatalogPagination.page_query_params
+    )
     filter_backends = [DjangoFilterBackend]
     filterset_class = TitleFilter
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_count_versions(self, request):
+        # Отзыв меняет рейтинг, а значит, и число произведений только при
+        # фильтре по рейтингу
+        if any(
+            param in request.query_params
+            for param in self.rating_filter_params
+        ):
+            return (*self.count_versions, REVIEWS)
+        return self.count_versions
+
     def get_serializer_class(self):
         # Для операций чтения используем ReadSerializer
         if self.request.method == 'GET':
@@ -171,18 +240,24 @@ class TitleViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        return Title.objects.annotate(
-            calculated_rating=Avg('reviews__score')
-        ).all().order_by('name')
+        return (
+            Title.objects.select_related('category')
+            .prefetch_related('genre')
+            .order_by('name')
+        )
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(
+    ConditionalGetMixin, NestedResourceMixin, viewsets.ModelViewSet
+):
+    queryset = Review.objects.select_related('author')
+    pagination_class = ReviewCommentPagination
+    conditional_versions = (REVIEWS, USERS)
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-
-    def get_queryset(self):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        return title.reviews.all()
+    parent_model = Title
+    parent_field = 'title'
+    parent_lookups = {'pk': 'title_id'}
 
     def get_permissions(self):
         if self.action in ('update', 'partial_update', 'destroy'):
@@ -190,21 +265,36 @@ class ReviewViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, id=self.kwargs.get('title_id'))
-        serializer.save(author=self.request.user, title=title)
+        # Повторный отзыв отсекает ограничение unique_title_author: так
+        # нет лишнего запроса и гонки между проверкой и вставкой. Review.save
+        # работает в своей транзакции, поэтому после ошибки соединением
+        # можно пользоваться дальше
+        try:
+            self.save_with_parent(serializer, author=self.request.user)
+        except IntegrityError:
+            # Другие нарушения целостности не выдаём за повторный отзыв
+            if not Review.objects.filter(
+                title_id=self.get_parent_id(), author=self.request.user
+            ).exists():
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    constants.REVIEW_ALREADY_EXISTS_ERROR
+                ]}
+            )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(
+    ConditionalGetMixin, NestedResourceMixin, viewsets.ModelViewSet
+):
+    queryset = Comment.objects.select_related('author')
+    pagination_class = ReviewCommentPagination
+    conditional_versions = (REVIEWS, USERS)
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-
-    def get_queryset(self):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title_id=self.kwargs.get('title_id'),
-        )
-        return review.comments.all()
+    parent_model = Review
+    parent_field = 'review'
+    parent_lookups = {'pk': 'review_id', 'title_id': 'title_id'}
 
     def get_permissions(self):
         if self.action in ('update', 'partial_update', 'destroy'):
@@ -212,9 +302,30 @@ class CommentViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review,
-            id=self.kwargs.get('review_id'),
-            title_id=self.kwargs.get('title_id'),
-        )
-        serializer.save(author=self.request.user, review=review)
+        self.save_with_parent(serializer, author=self.request.user)
+
+
+class ReviewSearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Полнотекстовый поиск по отзывам (?q=, &title=, &author=)."""
+
+    queryset = Review.objects.select_related('author')
+    serializer_class = ReviewSearchSerializer
+    pagination_class = PubDateKeysetPagination
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = ReviewSearchFilter
+
+
+class CommentSearchViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Полнотекстовый поиск по комментариям (?q=, &title=, &review=,
+    &author=)."""
+
+    # От отзыва нужен только id произведения
+    queryset = Comment.objects.select_related('author').annotate(
+        title_id=F('review__title_id')
+    )
+    serializer_class = CommentSearchSerializer
+    pagination_class = PubDateKeysetPagination
+    permission_classes = [AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = CommentSearchFilter
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
 
 application = get_asgi_application()
+
+# Индекс автодополнения строится в фоне, пока воркер ждёт запросов
+from api.autocomplete import catalog_autocomplete  # noqa: E402
+
+catalog_autocomplete.warm_up()
@@ -13,12 +13,19 @@ TITLE_NAME_MAX_LENGTH = 256
 REVIEW_SCORE_MIN = 1
 REVIEW_SCORE_MAX = 10
 
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
 # Serializer constants
 USER_USERNAME_OCCUPIED_ERROR = 'Пользователь с таким username уже существует'
 USER_EMAIL_OCCUPIED_ERROR = 'Пользователь с таким email уже существует'
 USER_USERNAME_ME_ERROR = "Имя пользователя 'me' недопустимо."
 USER_NOT_FOUND_ERROR = 'Пользователь не найден'
 USER_WRONG_CONFIRMATION_CODE_ERROR = 'Неверный код подтверждения'
+USER_EXPIRED_CONFIRMATION_CODE_ERROR = ('Срок действия кода подтверждения '
+                                        'истёк, запросите новый код')
+USER_CONFIRMATION_ATTEMPTS_ERROR = ('Превышено число попыток ввода кода, '
+                                    'запросите новый код')
 
 CATEGORY_EMPTY_NAME_ERROR = 'Название категории не может быть пустым'
 CATEGORY_EMPTY_SLUG_ERROR = 'Slug категории не может быть пустым'
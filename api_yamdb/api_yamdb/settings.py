@@ -60,6 +60,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # SQLite не поддерживает SELECT ... FOR UPDATE: транзакция сразу
+        # берёт блокировку записи, и параллельные изменения отзыва
+        # выполняются по очереди, а не падают с database is locked
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
     }
 }
 
@@ -97,13 +101,49 @@ AUTH_USER_MODEL = 'mdb_users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'mdb_users.authentication.RoleClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': os.getenv('PAGINATION_DEFAULT_PAGE_SIZE', 20),
+    'PAGE_SIZE': int(os.getenv('PAGINATION_DEFAULT_PAGE_SIZE', 20)),
+}
+
+# Сколько секунд хранится закэшированное количество объектов для пагинации
+PAGINATION_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', 300)
+)
+
+# Сколько секунд пользователь, найденный по JWT, хранится в кэше
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# Время жизни закэшированных списков категорий и жанров (секунды) и размер
+# кэша ответов в памяти каждого процесса
+LIST_CACHE_TIMEOUT = int(os.getenv('LIST_CACHE_TIMEOUT', 600))
+LOCAL_CACHE_MAX_SIZE = int(os.getenv('LOCAL_CACHE_MAX_SIZE', 256))
+# Пересборку одного кэшированного значения выполняет один воркер: он
+# берёт аренду, остальные до SINGLE_FLIGHT_WAIT_TIMEOUT секунд ждут
+# результата, а устаревшую копию (хранится ещё STALE_TIMEOUT секунд)
+# отдают сразу
+SINGLE_FLIGHT_LEASE_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LEASE_TIMEOUT', 10))
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', 2))
+SINGLE_FLIGHT_STALE_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_STALE_TIMEOUT', 300))
+
+# Версии коллекций хранятся в кэше, и он должен быть общим для всех
+# процессов: по умолчанию это файловый кэш в каталоге проекта. LocMemCache
+# у каждого процесса свой, и изменения, сделанные одним воркером, другие
+# бы не видели. Для продакшена лучше подходит, например,
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
 }
 
 SIMPLE_JWT = {
@@ -117,3 +157,15 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 CONFIRMATION_CODE_BYTES_LENGTH = int(os.getenv('CONFIRMATION_CODE_BYTES_LENGTH', 32))
+# Срок действия кода подтверждения и число неверных попыток до его
+# блокировки; просроченные коды удаляет команда clear_confirmation_codes
+CONFIRMATION_CODE_TTL_MINUTES = int(os.getenv('CONFIRMATION_CODE_TTL_MINUTES', 60))
+CONFIRMATION_CODE_MAX_ATTEMPTS = int(os.getenv('CONFIRMATION_CODE_MAX_ATTEMPTS', 5))
+
+# Письма с кодом подтверждения отправляются фоновым потоком пачками через
+# одно соединение; False возвращает синхронную отправку внутри запроса
+CONFIRMATION_EMAIL_ASYNC = os.getenv('CONFIRMATION_EMAIL_ASYNC', 'True').lower() in ('true', '1', 'yes')
+CONFIRMATION_EMAIL_BATCH_SIZE = int(os.getenv('CONFIRMATION_EMAIL_BATCH_SIZE', 50))
+CONFIRMATION_EMAIL_MAX_RETRIES = int(os.getenv('CONFIRMATION_EMAIL_MAX_RETRIES', 3))
+CONFIRMATION_EMAIL_RETRY_DELAY = float(os.getenv('CONFIRMATION_EMAIL_RETRY_DELAY', 1))
+CONFIRMATION_EMAIL_FLUSH_TIMEOUT = float(os.getenv('CONFIRMATION_EMAIL_FLUSH_TIMEOUT', 10))
@@ -0,0 +1,149 @@
+"""Схлопывание одновременных пересборок кэшированных значений.
+
+В процессе значение по ключу строит один поток, остальные ждут его под
+блокировкой ключа. Между процессами ту же роль играет аренда (lease) в
+общем кэше: её получает один воркер, остальные ждут готового значения
+или, если в кэше лежит устаревшая копия, сразу отдают её.
+
+Значения хранятся вместе с моментом, до которого они считаются свежими,
+и живут в кэше дольше этого момента на ``stale_timeout``. Ключи
+включают версии коллекций (см. versions.py), поэтому устаревшая копия
+отличается от свежей только возрастом и отдавать её безопасно.
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class KeyLocks:
+    """Блокировки по ключу внутри процесса.
+
+    Запись словаря живёт, пока ключ кто-то держит или ждёт, поэтому
+    словарь не растёт вместе с числом когда-либо встречавшихся ключей.
+    """
+
+    def __init__(self):
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, key, blocking=True):
+        with self.lock:
+            entry = self.locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        acquired = entry[0].acquire(blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                entry[0].release()
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.locks[key]
+
+
+class SingleFlight:
+    """Кэш с защитой от одновременной пересборки одного значения."""
+
+    def __init__(self, lease_timeout, wait_timeout, stale_timeout,
+                 poll_interval=0.05):
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = wait_timeout
+        self.stale_timeout = stale_timeout
+        self.poll_interval = poll_interval
+        self.key_locks = KeyLocks()
+
+    @staticmethod
+    def value_key(key):
+        return f'sf:{key}'
+
+    @staticmethod
+    def lease_key(key):
+        return f'sf-lease:{key}'
+
+    def acquire_lease(self, key):
+        token = uuid.uuid4().hex
+        if cache.add(self.lease_key(key), token, self.lease_timeout):
+            return token
+        return None
+
+    def release_lease(self, key, token):
+        if cache.get(self.lease_key(key)) == token:
+            cache.delete(self.lease_key(key))
+
+    def store(self, key, value, timeout):
+        cache.set(
+            self.value_key(key),
+            (time.time() + timeout, value),
+            timeout + self.stale_timeout,
+        )
+
+    def build(self, key, build, timeout):
+        value = build()
+        if value is not None:
+            self.store(key, value, timeout)
+        return value
+
+    def build_with_lease(self, key, build, timeout, token):
+        try:
+            return self.build(key, build, timeout)
+        finally:
+            self.release_lease(key, token)
+
+    def wait_for_value(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = cache.get(self.value_key(key))
+            if entry is not None:
+                return entry[1]
+            if cache.get(self.lease_key(key)) is None:
+                break
+        return None
+
+    def get_or_build(self, key, build, timeout):
+        """Возвращает значение из кэша или строит его один раз на ключ.
+
+        Если build вернул None, значение не кэшируется.
+        """
+        entry = cache.get(self.value_key(key))
+        if entry is not None:
+            fresh_until, value = entry
+            if fresh_until > time.time():
+                return value
+            return self.refresh_stale(key, build, timeout, value)
+        with self.key_locks.hold(key):
+            entry = cache.get(self.value_key(key))
+            if entry is not None:
+                return entry[1]
+            token = self.acquire_lease(key)
+            if token is not None:
+                return self.build_with_lease(key, build, timeout, token)
+            value = self.wait_for_value(key)
+            if value is not None:
+                return value
+            # Держатель аренды не успел или упал: строим сами
+            return self.build(key, build, timeout)
+
+    def refresh_stale(self, key, build, timeout, stale_value):
+        """Пересобирает устаревшее значение, если никто другой этим не
+        занят; иначе сразу отдаёт устаревшую копию."""
+        with self.key_locks.hold(key, blocking=False) as acquired:
+            if not acquired:
+                return stale_value
+            token = self.acquire_lease(key)
+            if token is None:
+                return stale_value
+            return self.build_with_lease(key, build, timeout, token)
+
+
+single_flight = SingleFlight(
+    lease_timeout=settings.SINGLE_FLIGHT_LEASE_TIMEOUT,
+    wait_timeout=settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+    stale_timeout=settings.SINGLE_FLIGHT_STALE_TIMEOUT,
+)
@@ -0,0 +1,55 @@
+"""Версии коллекций для инвалидации кэшей.
+
+Версия — отметка времени последнего изменения коллекции в наносекундах.
+Она хранится в общем кэше Django, поэтому изменение, сделанное в одном
+процессе, сразу видно всем остальным. Ключи кэшей, зависящих от
+коллекции, включают её версию, и старые записи просто перестают
+читаться.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG = 'catalog'
+CATEGORIES = 'categories'
+GENRES = 'genres'
+REVIEWS = 'reviews'
+USERS = 'users'
+
+
+def _key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    version = cache.get(_key(name))
+    if version is None:
+        # Версия потеряна (очистка или вытеснение из кэша): считаем, что
+        # коллекция изменилась только что
+        cache.add(_key(name), time.time_ns(), timeout=None)
+        version = cache.get(_key(name))
+    return version
+
+
+def get_versions(*names):
+    return tuple(get_version(name) for name in names)
+
+
+def _set_new_version(name):
+    cache.set(_key(name), time.time_ns(), timeout=None)
+
+
+def bump_version(name):
+    """Помечает коллекцию изменённой.
+
+    Внутри транзакции версия меняется сразу и ещё раз после коммита:
+    иначе параллельный запрос мог бы закэшировать незакоммиченное
+    состояние под новой версией. Вне транзакции изменение уже
+    зафиксировано, и одной смены версии достаточно, а лишняя заставила бы
+    зависящие от версии кэши (например, индекс автодополнения)
+    пересобираться дважды.
+    """
+    _set_new_version(name)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _set_new_version(name))
@@ -36,14 +36,6 @@ class UserAdmin(BaseUserAdmin):
                 'description': 'Дата последнего входа и регистрации',
             },
         ),
-        (
-            'Дополнительно',
-            {
-                'fields': ('confirmation_code',),
-                'classes': ('collapse',),
-                'description': 'Код подтверждения регистрации',
-            },
-        ),
     )
 
     add_fieldsets = (
@@ -70,7 +62,6 @@ class UserAdmin(BaseUserAdmin):
         'is_staff',
         'is_active',
         'date_joined',
-        'confirmation_code',
     )
     list_filter = ('role', 'is_staff', 'is_active', 'date_joined')
     search_fields = ('username', 'email', 'first_name', 'last_name')
@@ -5,3 +5,6 @@ class MdbUsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "mdb_users"
     verbose_name = "Пользователи YaMDB"
+
+    def ready(self):
+        import mdb_users.signals  # noqa: F401
@@ -0,0 +1,204 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+User = get_user_model()
+
+# Claims токена доступа, по которым проверяются права без запроса к БД
+ROLE_CLAIM = 'role'
+SUPERUSER_CLAIM = 'is_superuser'
+TOKEN_VERSION_CLAIM = 'ver'
+
+# Поля пользователя, которые держатся в кэше аутентификации. Хеш пароля
+# и остальной профиль туда не попадают
+CACHED_USER_FIELDS = (
+    'id', 'username', 'role', 'is_superuser', 'is_active', 'token_version'
+)
+# Для проверки отзыва токена хватает md5 от хеша пароля, как в самом токене
+PASSWORD_DIGEST = 'password_digest'
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def token_state_key(user_id):
+    return f'auth:token_state:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    invalidate_cached_users([user_id])
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([
+        key
+        for user_id in user_ids
+        for key in (user_cache_key(user_id), token_state_key(user_id))
+    ])
+
+
+def add_role_claims(token, user):
+    token[ROLE_CLAIM] = user.role
+    token[SUPERUSER_CLAIM] = user.is_superuser
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def get_token_state(user_id):
+    """Текущие (token_version, is_active) пользователя или None.
+
+    Значение сбрасывают сигналы пользователя; срок
+    AUTH_USER_CACHE_TIMEOUT ограничивает жизнь устаревшего значения после
+    QuerySet.update(), который сигналов не отправляет.
+    """
+    key = token_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = (
+            User.objects.filter(pk=user_id)
+            .values_list('token_version', 'is_active')
+            .first()
+        )
+        if state is None:
+            return None
+        cache.set(key, state, settings.AUTH_USER_CACHE_TIMEOUT)
+    return tuple(state)
+
+
+def user_record(user):
+    """Запись пользователя для кэша аутентификации."""
+    record = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+    if api_settings.CHECK_REVOKE_TOKEN:
+        record[PASSWORD_DIGEST] = get_md5_hash_password(user.password)
+    return record
+
+
+def user_from_record(record):
+    """Модель User по записи из кэша; остальные поля отложены и
+    читаются из БД при обращении."""
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in CACHED_USER_FIELDS
+    ]
+    return User.from_db(
+        DEFAULT_DB_ALIAS, field_names, [record[name] for name in field_names]
+    )
+
+
+def get_model_user(user):
+    """Возвращает пользователя со всеми полями профиля.
+
+    Пользователь из claims токена или из кэша аутентификации загружается
+    из БД целиком одним запросом.
+    """
+    if isinstance(user, User) and not user.get_deferred_fields():
+        return user
+    return User.objects.get(pk=user.pk)
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь, собранный из claims токена без обращения к БД.
+
+    Даёт те же признаки роли, что и модель User, поэтому подходит для
+    классов из mdb_users.permissions.
+    """
+
+    @cached_property
+    def role(self):
+        return self.token[ROLE_CLAIM]
+
+    @cached_property
+    def is_superuser(self):
+        return self.token[SUPERUSER_CLAIM]
+
+    @property
+    def is_admin(self):
+        return self.role == User.ADMIN or self.is_superuser
+
+    @property
+    def is_moderator(self):
+        return self.role == User.MODERATOR
+
+    @property
+    def is_user(self):
+        return self.role == User.USER
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, который не читает пользователя из БД на каждый
+    запрос, а держит запись о нём (user_record) в кэше
+    AUTH_USER_CACHE_TIMEOUT секунд.
+
+    Запись сбрасывается сигналами при сохранении и удалении пользователя
+    (см. mdb_users.signals), поэтому смена роли видна сразу.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        key = user_cache_key(user_id)
+        record = cache.get(key)
+        if record is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user_record(user), settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+        self.check_record(record, validated_token)
+        return user_from_record(record)
+
+    def check_record(self, record, validated_token):
+        """Те же проверки, что JWTAuthentication делает после чтения из БД."""
+        if api_settings.CHECK_USER_IS_ACTIVE and not record['is_active']:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != record[PASSWORD_DIGEST]:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."),
+                code='password_changed',
+            )
+
+
+class RoleClaimsJWTAuthentication(CachedJWTAuthentication):
+    """Для безопасных методов строит пользователя из claims токена.
+
+    Claims ``role``, ``is_superuser`` и ``ver`` добавляет TokenSerializer.
+    Они считаются достоверными, только если ``ver`` совпадает с текущей
+    token_version пользователя, а пользователь активен; состояние берётся
+    из кэша (get_token_state). Смена роли увеличивает token_version, и
+    старые токены дальше работают через обычную загрузку пользователя.
+    Запросы на запись всегда получают модель User.
+    """
+
+    def authenticate(self, request):
+        self.claims_allowed = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.claims_allowed and self.claims_are_current(validated_token):
+            return RoleTokenUser(validated_token)
+        return super().get_user(validated_token)
+
+    def claims_are_current(self, validated_token):
+        claims = (ROLE_CLAIM, SUPERUSER_CLAIM, TOKEN_VERSION_CLAIM)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None or any(
+            claim not in validated_token for claim in claims
+        ):
+            return False
+        state = get_token_state(user_id)
+        return state is not None and state == (
+            validated_token[TOKEN_VERSION_CLAIM], True
+        )
@@ -0,0 +1,100 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """Очередь писем, которую разбирает фоновый поток.
+
+    Поток забирает из очереди до ``batch_size`` писем и отправляет их
+    через одно соединение с почтовым бэкендом. Если отправка падает,
+    неотправленный остаток пачки повторяется с экспоненциальной
+    задержкой до ``max_retries`` раз, после чего письма пишутся в лог.
+    """
+
+    def __init__(self, batch_size, max_retries, retry_delay):
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def put(self, message):
+        self.start()
+        self.queue.put(message)
+
+    def start(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self.run, name='mail-queue', daemon=True
+                )
+                self.worker.start()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.deliver(batch)
+            except Exception:
+                logger.exception('Mail queue worker failed')
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def deliver(self, batch):
+        pending = list(batch)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with get_connection(fail_silently=False) as connection:
+                    while pending:
+                        connection.send_messages(pending[:1])
+                        pending.pop(0)
+                return
+            except Exception as e:
+                logger.warning(
+                    'Sending %s messages failed (attempt %s): %s',
+                    len(pending), attempt + 1, e,
+                )
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        recipients = [address for message in pending for address in message.to]
+        logger.error(
+            'Dropped %s messages to %s after %s attempts',
+            len(pending), ', '.join(recipients), self.max_retries + 1,
+        )
+
+    def flush(self, timeout=None):
+        """Ждёт, пока очередь опустеет; возвращает True, если дождался."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
+mail_queue = MailQueue(
+    batch_size=settings.CONFIRMATION_EMAIL_BATCH_SIZE,
+    max_retries=settings.CONFIRMATION_EMAIL_MAX_RETRIES,
+    retry_delay=settings.CONFIRMATION_EMAIL_RETRY_DELAY,
+)
+# Письма, стоящие в очереди при остановке процесса, стараемся дослать
+atexit.register(mail_queue.flush, settings.CONFIRMATION_EMAIL_FLUSH_TIMEOUT)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from mdb_users.tokens import delete_expired_confirmation_codes
+
+
+class Command(BaseCommand):
+    help = 'Delete expired confirmation codes'
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_confirmation_codes()
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} expired codes')
+        )
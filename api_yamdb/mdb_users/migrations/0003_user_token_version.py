@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mdb_users', '0002_alter_user_options_alter_user_bio_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия прав в токенах'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.1 on 2026-10-18 06:04
+
+import hashlib
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def move_confirmation_codes(apps, schema_editor):
+    User = apps.get_model('mdb_users', 'User')
+    ConfirmationCode = apps.get_model('mdb_users', 'ConfirmationCode')
+    expires_at = timezone.now() + timedelta(
+        minutes=settings.CONFIRMATION_CODE_TTL_MINUTES
+    )
+    ConfirmationCode.objects.bulk_create(
+        [
+            ConfirmationCode(
+                user_id=user_id,
+                code_hash=hashlib.sha256(code.encode()).hexdigest(),
+                expires_at=expires_at,
+            )
+            for user_id, code in User.objects.exclude(
+                confirmation_code=''
+            ).values_list('pk', 'confirmation_code').iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mdb_users', '0003_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmationCode',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='confirmation', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('code_hash', models.CharField(max_length=64, verbose_name='Хеш кода')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Неудачных попыток')),
+            ],
+            options={
+                'verbose_name': 'Код подтверждения',
+                'verbose_name_plural': 'Коды подтверждения',
+            },
+        ),
+        migrations.RunPython(
+            move_confirmation_codes, migrations.RunPython.noop
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='confirmation_code',
+        ),
+    ]
@@ -1,5 +1,9 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Case, F, Q, When
 
 
 class User(AbstractUser):
@@ -27,8 +31,10 @@ class User(AbstractUser):
     last_name = models.CharField(
         max_length=150, blank=True, verbose_name='Фамилия'
     )
-    confirmation_code = models.CharField(
-        max_length=100, blank=True, verbose_name='Код подтверждения'
+    # Растёт при смене роли или прав суперпользователя; токены со старой
+    # версией в claims перестают считаться достоверными
+    token_version = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Версия прав в токенах'
     )
 
     class Meta:
@@ -36,6 +42,37 @@ class User(AbstractUser):
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
 
+    # Поля, которые попадают в claims токена (см. TokenSerializer)
+    TOKEN_CLAIM_FIELDS = ('role', 'is_superuser')
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (
+            update_fields is not None
+            and not set(update_fields) & set(self.TOKEN_CLAIM_FIELDS)
+        ):
+            super().save(*args, **kwargs)
+            return
+        # Версия растёт в том же UPDATE, если claims в строке отличаются от
+        # сохраняемых: условие видит значения до обновления, поэтому не
+        # нужно ни отдельного запроса, ни запоминать claims при загрузке
+        claims_changed = reduce(or_, (
+            ~Q(**{field: getattr(self, field)})
+            for field in self.TOKEN_CLAIM_FIELDS
+        ))
+        self.token_version = Case(
+            When(claims_changed, then=F('token_version') + 1),
+            default=F('token_version'),
+            output_field=models.PositiveIntegerField(),
+        )
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'token_version'}
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            # Новое значение перечитается из БД при первом обращении
+            del self.token_version
+
     @property
     def is_admin(self):
         return self.role == self.ADMIN or self.is_superuser
@@ -50,3 +87,34 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class ConfirmationCode(models.Model):
+    """Код подтверждения регистрации.
+
+    Хранится отдельно от пользователя, чтобы повторная выдача кода не
+    переписывала строку в таблице пользователей. Сам код не хранится,
+    только его хеш.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='confirmation',
+        verbose_name='Пользователь',
+    )
+    code_hash = models.CharField(max_length=64, verbose_name='Хеш кода')
+    expires_at = models.DateTimeField(
+        db_index=True, verbose_name='Действует до'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Неудачных попыток'
+    )
+
+    class Meta:
+        verbose_name = 'Код подтверждения'
+        verbose_name_plural = 'Коды подтверждения'
+
+    def __str__(self):
+        return f'Код подтверждения для {self.user_id}'
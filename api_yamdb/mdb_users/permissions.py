@@ -1,15 +1,44 @@
+from collections import namedtuple
+
 from rest_framework import permissions
 
+UserRoles = namedtuple(
+    'UserRoles', ('user_id', 'is_authenticated', 'is_admin', 'is_moderator')
+)
+
+
+def get_user_roles(request):
+    """Флаги ролей пользователя, вычисленные один раз за запрос."""
+    roles = getattr(request, '_user_roles', None)
+    if roles is None:
+        user = request.user
+        is_authenticated = bool(user and user.is_authenticated)
+        roles = UserRoles(
+            user_id=user.id if is_authenticated else None,
+            is_authenticated=is_authenticated,
+            is_admin=is_authenticated and user.is_admin,
+            is_moderator=is_authenticated and user.is_moderator,
+        )
+        request._user_roles = roles
+    return roles
+
+
+def is_author(request, obj):
+    """Сравнивает id автора, не загружая связанного пользователя."""
+    roles = get_user_roles(request)
+    return roles.is_authenticated and obj.author_id == roles.user_id
+
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.is_admin
+        return get_user_roles(request).is_admin
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.method in permissions.SAFE_METHODS or (
-            request.user.is_authenticated and request.user.is_admin
+        return (
+            request.method in permissions.SAFE_METHODS
+            or get_user_roles(request).is_admin
         )
 
 
@@ -17,17 +46,24 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return (
             request.method in permissions.SAFE_METHODS
-            or obj.author == request.user
+            or is_author(request, obj)
         )
 
 
 class IsAuthorOrModeratorOrAdmin(permissions.BasePermission):
+    def has_permission(self, request, view):
+        # Анонимный запрос на запись отклоняется до загрузки объекта
+        return (
+            request.method in permissions.SAFE_METHODS
+            or get_user_roles(request).is_authenticated
+        )
+
     def has_object_permission(self, request, view, obj):
-        return request.method in permissions.SAFE_METHODS or (
-            request.user.is_authenticated
-            and (
-                obj.author == request.user
-                or request.user.is_moderator
-                or request.user.is_admin
-            )
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        roles = get_user_roles(request)
+        return (
+            is_author(request, obj)
+            or roles.is_moderator
+            or roles.is_admin
         )
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api_yamdb.versions import USERS, bump_version
+from mdb_users.authentication import invalidate_cached_user
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_version(sender, **kwargs):
+    bump_version(USERS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    # Второй раз после коммита: параллельный запрос мог успеть положить в
+    # кэш ещё не изменённую запись
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
@@ -1,27 +1,111 @@
+import hashlib
 import secrets
+from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 
+import api_yamdb.constants as constants
 from api_yamdb.exceptions import SendConfirmationCodeError
+from mdb_users.mail_queue import mail_queue
+from mdb_users.models import ConfirmationCode
 
 
 def generate_confirmation_code():
     return secrets.token_urlsafe(settings.CONFIRMATION_CODE_BYTES_LENGTH)
 
 
+def hash_confirmation_code(confirmation_code):
+    return hashlib.sha256(confirmation_code.encode()).hexdigest()
+
+
+def store_confirmation_code(user, confirmation_code):
+    """Сохраняет хеш нового кода одним INSERT ... ON CONFLICT.
+
+    Предыдущий код пользователя заменяется, счётчик попыток
+    сбрасывается; строка пользователя не изменяется.
+    """
+    ConfirmationCode.objects.bulk_create(
+        [
+            ConfirmationCode(
+                user=user,
+                code_hash=hash_confirmation_code(confirmation_code),
+                expires_at=timezone.now() + timedelta(
+                    minutes=settings.CONFIRMATION_CODE_TTL_MINUTES
+                ),
+                attempts=0,
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['code_hash', 'expires_at', 'attempts'],
+    )
+
+
+def check_confirmation_code(user, confirmation_code):
+    """Проверяет и погашает код; возвращает текст ошибки или None.
+
+    Код пользователя должен быть загружен вместе с ним через
+    select_related('confirmation'). Верный код удаляется, поэтому токен по
+    нему выдаётся один раз; неверная попытка увеличивает счётчик. Оба
+    действия — условные запросы к строке кода, так что параллельные
+    запросы не обходят ни однократность кода, ни лимит попыток.
+    """
+    try:
+        stored = user.confirmation
+    except ConfirmationCode.DoesNotExist:
+        return constants.USER_WRONG_CONFIRMATION_CODE_ERROR
+    now = timezone.now()
+    if stored.expires_at <= now:
+        return constants.USER_EXPIRED_CONFIRMATION_CODE_ERROR
+    if stored.attempts >= settings.CONFIRMATION_CODE_MAX_ATTEMPTS:
+        return constants.USER_CONFIRMATION_ATTEMPTS_ERROR
+    codes = ConfirmationCode.objects.filter(
+        pk=stored.pk, attempts__lt=settings.CONFIRMATION_CODE_MAX_ATTEMPTS
+    )
+    if constant_time_compare(
+        stored.code_hash, hash_confirmation_code(confirmation_code)
+    ):
+        # Код мог успеть погасить или заменить параллельный запрос
+        deleted, _ = codes.filter(
+            code_hash=stored.code_hash, expires_at__gt=now
+        ).delete()
+        if not deleted:
+            return constants.USER_WRONG_CONFIRMATION_CODE_ERROR
+        return None
+    if not codes.update(attempts=F('attempts') + 1):
+        return constants.USER_CONFIRMATION_ATTEMPTS_ERROR
+    return constants.USER_WRONG_CONFIRMATION_CODE_ERROR
+
+
+def delete_expired_confirmation_codes():
+    """Удаляет все просроченные коды одним запросом."""
+    deleted, _ = ConfirmationCode.objects.filter(
+        expires_at__lte=timezone.now()
+    ).delete()
+    return deleted
+
+
 def send_confirmation_code(email, confirmation_code):
-    subject = 'Код подтверждения YaMDb'
-    message = f'Ваш код подтверждения: {confirmation_code}'
+    """Отправляет код подтверждения.
 
+    При CONFIRMATION_EMAIL_ASYNC письмо только ставится в очередь, и
+    ответ на запрос не ждёт почтового сервера.
+    """
+    message = EmailMessage(
+        subject='Код подтверждения YaMDb',
+        body=f'Ваш код подтверждения: {confirmation_code}',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+    )
+    if settings.CONFIRMATION_EMAIL_ASYNC:
+        mail_queue.put(message)
+        return True
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=False,
-        )
+        message.send(fail_silently=False)
         return True
     except Exception as e:
         raise SendConfirmationCodeError(('Ошибка при отправке кода '
@@ -1,7 +1,11 @@
+from functools import reduce
+from operator import or_
+
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.search import comment_index, review_index, title_index
 
 User = get_user_model()
 
@@ -47,6 +51,7 @@ class TitleAdmin(admin.ModelAdmin):
         'name',
         'year',
         'category',
+        'rating',
         'display_genres',
         'description_short',
     )
@@ -71,10 +76,45 @@ class TitleAdmin(admin.ModelAdmin):
     description_short.short_description = 'Описание'
 
 
-class ReviewAdmin(admin.ModelAdmin):
+class FullTextSearchAdmin(admin.ModelAdmin):
+    """Поиск в админке через полнотекстовые индексы вместо LIKE '%x%'.
+
+    Ищется по индексу модели (search_index) и индексам связанных моделей
+    (search_related_indexes: пары индекс и поле связи). search_fields
+    обрабатывает стандартный поиск Django, и его результаты добавляются
+    к найденному по индексам.
+    """
+
+    search_index = None
+    search_related_indexes = ()
+
+    def get_search_condition(self, search_term):
+        indexes = (
+            (self.search_index, 'pk'), *self.search_related_indexes
+        )
+        return reduce(or_, (
+            search_index.match(search_term, field=field)
+            for search_index, field in indexes
+        ))
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        matched, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        return (
+            queryset.filter(self.get_search_condition(search_term))
+            | matched
+        ), may_have_duplicates
+
+
+class ReviewAdmin(FullTextSearchAdmin):
     list_display = ('title', 'author', 'score', 'text_short', 'pub_date')
     list_filter = ('score', 'pub_date')
-    search_fields = ('text', 'author__username', 'title__name')
+    search_fields = ('=author__username',)
+    search_index = review_index
+    search_related_indexes = ((title_index, 'title'),)
     raw_id_fields = ('title', 'author')
     list_per_page = 20
 
@@ -84,9 +124,11 @@ class ReviewAdmin(admin.ModelAdmin):
     text_short.short_description = 'Текст отзыва'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchAdmin):
     list_display = ('review', 'author', 'text_short', 'pub_date')
-    search_fields = ('text', 'author__username', 'review__text')
+    search_fields = ('=author__username',)
+    search_index = comment_index
+    search_related_indexes = ((review_index, 'review'),)
     raw_id_fields = ('review', 'author')
     list_per_page = 20
 
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReviewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reviews'
+
+    def ready(self):
+        import reviews.signals  # noqa: F401
+        from reviews.search import sync_search_indexes
+        post_migrate.connect(sync_search_indexes, sender=self)
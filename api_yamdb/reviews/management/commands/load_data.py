@@ -1,13 +1,234 @@
 import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 
+import django
+from django import db
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import F
 
+import api_yamdb.constants as constants
+from api_yamdb.versions import (CATALOG, CATEGORIES, GENRES, REVIEWS, USERS,
+                                bump_version)
+from mdb_users.authentication import invalidate_cached_users
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import rebuild_ratings
+from reviews.search import SEARCH_INDEXES
 
 User = get_user_model()
 
+DEFAULT_CHUNK_SIZE = 5000
+CHECKPOINT_FILE_NAME = '.load_data.checkpoint.json'
+# Поля, которые режим --upsert не перезаписывает у существующих записей
+NON_UPDATABLE_FIELDS = ('password',)
+
+
+def read_chunks(file_path, chunk_size, skip=0):
+    """Построчно читает CSV и отдаёт строки порциями по chunk_size.
+
+    Первые skip строк (уже загруженные по контрольной точке) пропускаются.
+    """
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        for _ in islice(reader, skip):
+            pass
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def file_signature(file_path):
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, checkpoint):
+    """Атомарно перезаписывает файл контрольной точки."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def parse_chunk(parse, chunk, first_line):
+    """Разбирает и проверяет порцию строк CSV.
+
+    Выполняется в рабочих процессах, поэтому не обращается к БД и
+    возвращает ошибки текстом, а не пишет их в вывод команды.
+    """
+    started = time.monotonic()
+    rows, errors = [], []
+    for number, row in enumerate(chunk, first_line):
+        try:
+            rows.append(parse(row))
+        except (KeyError, TypeError, ValueError) as e:
+            errors.append(f'row {number} skipped: {e!r}')
+    return rows, errors, time.monotonic() - started
+
+
+def parse_category(row):
+    return {'id': int(row['id']), 'name': row['name'], 'slug': row['slug']}
+
+
+def parse_genre(row):
+    return {'id': int(row['id']), 'name': row['name'], 'slug': row['slug']}
+
+
+def parse_user(row):
+    return {
+        'id': int(row['id']),
+        'username': row['username'],
+        'email': row['email'],
+        'role': row['role'],
+        'bio': row['bio'] or '',
+        'first_name': row['first_name'] or '',
+        'last_name': row['last_name'] or '',
+        'password': make_password(None),
+    }
+
+
+def parse_title(row):
+    return {
+        'id': int(row['id']),
+        'name': row['name'],
+        'year': int(row['year']),
+        'category_id': int(row['category']) if row['category'] else None,
+        'description': row.get('description') or '',
+    }
+
+
+def parse_genre_title(row):
+    return {
+        'title_id': int(row['title_id']),
+        'genre_id': int(row['genre_id']),
+    }
+
+
+def parse_review(row):
+    score = int(row['score'])
+    if not constants.REVIEW_SCORE_MIN <= score <= constants.REVIEW_SCORE_MAX:
+        raise ValueError(f'score {score} is out of range')
+    return {
+        'id': int(row['id']),
+        'title_id': int(row['title_id']),
+        'author_id': int(row['author']),
+        'text': row['text'],
+        'score': score,
+        'pub_date': row['pub_date'],
+    }
+
+
+def parse_comment(row):
+    return {
+        'id': int(row['id']),
+        'review_id': int(row['review_id']),
+        'author_id': int(row['author']),
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+    }
+
+
+# Файл, модель, разбор строки и внешние ключи, которые нужно проверить.
+# Порядок важен: файл загружается после файлов, на которые он ссылается.
+SOURCES = (
+    ('category.csv', Category, parse_category, {}),
+    ('genre.csv', Genre, parse_genre, {}),
+    ('users.csv', User, parse_user, {}),
+    ('titles.csv', Title, parse_title, {'category_id': Category}),
+    (
+        'genre_title.csv',
+        Title.genre.through,
+        parse_genre_title,
+        {'title_id': Title, 'genre_id': Genre},
+    ),
+    (
+        'review.csv',
+        Review,
+        parse_review,
+        {'title_id': Title, 'author_id': User},
+    ),
+    (
+        'comments.csv',
+        Comment,
+        parse_comment,
+        {'review_id': Review, 'author_id': User},
+    ),
+)
+# Файлы одной стадии не зависят друг от друга и разбираются параллельно,
+# следующая стадия начинается после записи всех файлов предыдущей
+STAGES = (
+    ('category.csv', 'genre.csv', 'users.csv'),
+    ('titles.csv',),
+    ('genre_title.csv', 'review.csv'),
+    ('comments.csv',),
+)
+
+
+class InlineExecutor:
+    """Исполнитель без процессов для --workers 1: тот же интерфейс,
+    что у ProcessPoolExecutor, но задачи выполняются сразу."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class ParsedChunks:
+    """Порции одного файла, отправленные на разбор в пул процессов.
+
+    Сразу после создания ставит в работу до window порций, чтобы файлы
+    одной стадии разбирались, пока единственный писатель занят другим
+    файлом. Итерация отдаёт результаты строго в порядке файла.
+    """
+
+    def __init__(self, executor, file_path, parse, chunk_size, skip, window):
+        self.executor = executor
+        self.parse = parse
+        self.window = window
+        self.skip = skip
+        self.chunks = read_chunks(file_path, chunk_size, skip=skip)
+        self.next_line = skip + 1
+        self.pending = deque()
+        self.fill()
+
+    def fill(self):
+        while len(self.pending) < self.window:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return
+            future = self.executor.submit(
+                parse_chunk, self.parse, chunk, self.next_line
+            )
+            self.pending.append((len(chunk), future))
+            self.next_line += len(chunk)
+
+    def __iter__(self):
+        while self.pending:
+            size, future = self.pending.popleft()
+            self.fill()
+            yield (size, *future.result())
+
 
 class Command(BaseCommand):
     help = 'Load data from CSV files into database'
@@ -19,122 +240,270 @@ class Command(BaseCommand):
             default='static/data/',
             help='Base path to CSV files',
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Number of CSV rows committed per transaction',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes that parse and validate CSV rows',
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Update rows that already exist instead of skipping them',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=None,
+            help=(
+                'Checkpoint file with the last committed row of each CSV '
+                f'(default: <path>/{CHECKPOINT_FILE_NAME})'
+            ),
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and load every file from the start',
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         base_path = options['path']
-        self.load_categories(f'{base_path}category.csv')
-        self.load_genres(f'{base_path}genre.csv')
-        self.load_users(f'{base_path}users.csv')
-        self.load_titles(f'{base_path}titles.csv')
-        self.load_genre_title(f'{base_path}genre_title.csv')
-        self.load_reviews(f'{base_path}review.csv')
-        self.load_comments(f'{base_path}comments.csv')
-
-    def load_categories(self, file_path):
-        self.stdout.write(f'Loading categories from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                Category.objects.get_or_create(
-                    id=row['id'],
-                    defaults={'name': row['name'], 'slug': row['slug']},
-                )
-        self.stdout.write(self.style.SUCCESS('Categories loaded'))
-
-    def load_genres(self, file_path):
-        self.stdout.write(f'Loading genres from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                Genre.objects.get_or_create(
-                    id=row['id'],
-                    defaults={'name': row['name'], 'slug': row['slug']},
-                )
-        self.stdout.write(self.style.SUCCESS('Genres loaded'))
-
-    def load_users(self, file_path):
-        self.stdout.write(f'Loading users from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                User.objects.get_or_create(
-                    id=row['id'],
-                    defaults={
-                        'username': row['username'],
-                        'email': row['email'],
-                        'role': row['role'],
-                        'bio': row['bio'] or '',
-                        'first_name': row['first_name'] or '',
-                        'last_name': row['last_name'] or '',
-                    },
-                )
-        self.stdout.write(self.style.SUCCESS('Users loaded'))
-
-    def load_titles(self, file_path):
-        self.stdout.write(f'Loading titles from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                category = (
-                    Category.objects.get(id=row['category'])
-                    if row['category']
-                    else None
-                )
-                Title.objects.get_or_create(
-                    id=row['id'],
-                    defaults={
-                        'name': row['name'],
-                        'year': row['year'],
-                        'category': category,
-                        'description': row.get('description', ''),
-                    },
-                )
-        self.stdout.write(self.style.SUCCESS('Titles loaded'))
-
-    def load_genre_title(self, file_path):
-        self.stdout.write(f'Loading genre-title relations from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                title = Title.objects.get(id=row['title_id'])
-                genre = Genre.objects.get(id=row['genre_id'])
-                title.genre.add(genre)
-        self.stdout.write(self.style.SUCCESS('Genre-Title relations loaded'))
-
-    def load_reviews(self, file_path):
-        self.stdout.write(f'Loading reviews from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                title = Title.objects.get(id=row['title_id'])
-                author = User.objects.get(id=row['author'])
-                Review.objects.get_or_create(
-                    id=row['id'],
-                    defaults={
-                        'title': title,
-                        'text': row['text'],
-                        'author': author,
-                        'score': row['score'],
-                        'pub_date': row['pub_date'],
-                    },
-                )
-        self.stdout.write(self.style.SUCCESS('Reviews loaded'))
-
-    def load_comments(self, file_path):
-        self.stdout.write(f'Loading comments from {file_path}...')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                review = Review.objects.get(id=row['review_id'])
-                author = User.objects.get(id=row['author'])
-                Comment.objects.get_or_create(
-                    id=row['id'],
-                    defaults={
-                        'review': review,
-                        'text': row['text'],
-                        'author': author,
-                        'pub_date': row['pub_date'],
-                    },
-                )
-        self.stdout.write(self.style.SUCCESS('Comments loaded'))
+        self.chunk_size = options['chunk_size']
+        self.upsert = options['upsert']
+        self.checkpoint_path = options['checkpoint'] or (
+            f'{base_path}{CHECKPOINT_FILE_NAME}'
+        )
+        self.checkpoint = (
+            {} if options['restart'] else load_checkpoint(self.checkpoint_path)
+        )
+        self.known_ids = {}
+        self.workers = max(options['workers'], 1)
+        executor = self.get_executor()
+        try:
+            for number, stage in enumerate(STAGES, 1):
+                self.load_stage(executor, base_path, number, stage)
+        finally:
+            executor.shutdown()
+        fixed = rebuild_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f'Ratings rebuilt for {fixed} titles')
+        )
+        for search_index in SEARCH_INDEXES:
+            search_index.rebuild()
+        # bulk_create не отправляет сигналы, поэтому кэши сбрасываем явно
+        for name in (CATALOG, CATEGORIES, GENRES, REVIEWS, USERS):
+            bump_version(name)
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def get_executor(self):
+        if self.workers == 1:
+            return InlineExecutor()
+        # Рабочие процессы не ходят в БД, но унаследованные при fork
+        # соединения лучше закрыть заранее
+        db.connections.close_all()
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=django.setup
+        )
+
+    def load_stage(self, executor, base_path, number, stage):
+        started = time.monotonic()
+        sources = {source[0]: source for source in SOURCES}
+        pipelines = [
+            (sources[file_name], self.start_parsing(
+                executor, base_path, sources[file_name]
+            ))
+            for file_name in stage
+        ]
+        parse_time = write_time = 0
+        for source, chunks in pipelines:
+            file_parse_time, file_write_time = self.load_file(
+                base_path, source, chunks
+            )
+            parse_time += file_parse_time
+            write_time += file_write_time
+        self.stdout.write(
+            f'Stage {number}/{len(STAGES)} [{", ".join(stage)}]: '
+            f'{time.monotonic() - started:.2f}s '
+            f'(parse {parse_time:.2f}s in {self.workers} workers, '
+            f'write {write_time:.2f}s)'
+        )
+
+    def start_parsing(self, executor, base_path, source):
+        file_name, _, parse, _ = source
+        file_path = f'{base_path}{file_name}'
+        return ParsedChunks(
+            executor,
+            file_path,
+            parse,
+            self.chunk_size,
+            self.get_committed_rows(file_name, file_path),
+            self.workers * 2,
+        )
+
+    def get_known_ids(self, model):
+        """Множество id, уже существующих в таблице модели."""
+        if model not in self.known_ids:
+            self.known_ids[model] = set(
+                model.objects.values_list('pk', flat=True)
+            )
+        return self.known_ids[model]
+
+    def resolve_foreign_keys(self, rows, foreign_keys):
+        """Отбрасывает строки, ссылающиеся на несуществующие объекты."""
+        known = {
+            field: self.get_known_ids(model)
+            for field, model in foreign_keys.items()
+        }
+        return [
+            row
+            for row in rows
+            if all(
+                row[field] is None or row[field] in ids
+                for field, ids in known.items()
+            )
+        ]
+
+    def get_update_fields(self, model, row):
+        return [
+            field.name
+            for field in model._meta.concrete_fields
+            if field.attname in row
+            and not field.primary_key
+            and not getattr(field, 'auto_now_add', False)
+            and field.name not in NON_UPDATABLE_FIELDS
+        ]
+
+    def bulk_write(self, model, rows):
+        objects = [model(**row) for row in rows]
+        update_fields = self.get_update_fields(model, rows[0])
+        if self.upsert and 'id' in rows[0] and update_fields:
+            changed_claims = (
+                self.find_changed_claims(rows, update_fields)
+                if model is User else []
+            )
+            model.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=update_fields,
+            )
+            if changed_claims:
+                self.revoke_tokens(changed_claims)
+        else:
+            model.objects.bulk_create(objects, ignore_conflicts=True)
+
+    def find_changed_claims(self, rows, update_fields):
+        """id существующих пользователей, у которых upsert меняет поля
+        из claims токена (роль, права суперпользователя)."""
+        fields = [
+            field for field in User.TOKEN_CLAIM_FIELDS
+            if field in update_fields
+        ]
+        if not fields:
+            return []
+        current = {
+            pk: claims
+            for pk, *claims in User.objects.filter(
+                pk__in=[row['id'] for row in rows]
+            ).values_list('pk', *fields)
+        }
+        return [
+            row['id']
+            for row in rows
+            if row['id'] in current
+            and current[row['id']] != [row[field] for field in fields]
+        ]
+
+    def revoke_tokens(self, user_ids):
+        """Делает недостоверными claims уже выданных токенов.
+
+        bulk_create не вызывает User.save и не отправляет сигналы, поэтому
+        версия прав и кэш аутентификации обновляются здесь, как в них.
+        """
+        User.objects.filter(pk__in=user_ids).update(
+            token_version=F('token_version') + 1
+        )
+        invalidate_cached_users(user_ids)
+        transaction.on_commit(lambda: invalidate_cached_users(user_ids))
+
+    def write_rows_one_by_one(self, model, rows, file_path):
+        """Запасной путь для порции с ошибкой: пропускает только плохие
+        строки, а остальные фиксирует по одной."""
+        written = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    self.bulk_write(model, [row])
+            except (DataError, IntegrityError) as e:
+                self.stderr.write(f'{file_path}: {row} skipped: {e}')
+            else:
+                written.append(row)
+        return written
+
+    def write_chunk(self, model, rows, file_path):
+        try:
+            with transaction.atomic():
+                self.bulk_write(model, rows)
+        except (DataError, IntegrityError):
+            rows = self.write_rows_one_by_one(model, rows, file_path)
+        if rows and 'id' in rows[0]:
+            # ignore_conflicts пропускает и строки с занятыми username/slug,
+            # поэтому в кэш id кладём только реально существующие записи
+            self.get_known_ids(model).update(
+                model.objects.filter(
+                    pk__in=[row['id'] for row in rows]
+                ).values_list('pk', flat=True)
+            )
+        return len(rows)
+
+    def get_committed_rows(self, file_name, file_path):
+        """Число строк файла, уже зафиксированных в прошлых запусках."""
+        state = self.checkpoint.get(file_name)
+        if state and state['signature'] == file_signature(file_path):
+            return state['rows']
+        return 0
+
+    def commit_progress(self, file_name, file_path, rows):
+        self.checkpoint[file_name] = {
+            'rows': rows,
+            'signature': file_signature(file_path),
+        }
+        save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def load_file(self, base_path, source, chunks):
+        file_name, model, _, foreign_keys = source
+        file_path = f'{base_path}{file_name}'
+        done = chunks.skip
+        if done:
+            self.stdout.write(f'Resuming {file_path} after row {done}...')
+        else:
+            self.stdout.write(f'Loading {file_path}...')
+        started = time.monotonic()
+        total = written = 0
+        parse_time = write_time = 0
+        for size, rows, errors, chunk_parse_time in chunks:
+            for error in errors:
+                self.stderr.write(f'{file_path}: {error}')
+            parse_time += chunk_parse_time
+            write_started = time.monotonic()
+            rows = self.resolve_foreign_keys(rows, foreign_keys)
+            if rows:
+                written += self.write_chunk(model, rows, file_path)
+            total += size
+            done += size
+            self.commit_progress(file_name, file_path, done)
+            write_time += time.monotonic() - write_started
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(self.style.SUCCESS(
+            f'{file_path}: {total} rows read, {written} written, '
+            f'{total - written} skipped, {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
+        return parse_time, write_time
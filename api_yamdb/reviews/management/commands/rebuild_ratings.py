@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.ratings import find_rating_mismatches, rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify stored title ratings from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify stored ratings, exit with error on mismatch',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatched = find_rating_mismatches()
+            if mismatched:
+                raise CommandError(
+                    f'Ratings out of sync for {len(mismatched)} titles: '
+                    f'{", ".join(map(str, mismatched[:20]))}'
+                )
+            self.stdout.write(self.style.SUCCESS('Ratings are consistent'))
+            return
+        fixed = rebuild_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(f'Ratings rebuilt for {fixed} titles')
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reviews.search import SEARCH_INDEXES
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search indexes'
+
+    def handle(self, *args, **options):
+        for search_index in SEARCH_INDEXES:
+            indexed = search_index.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f'{search_index.table}: {indexed} rows indexed'
+            ))
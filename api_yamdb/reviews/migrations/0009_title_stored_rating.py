@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 05:33
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    titles = Title.objects.annotate(
+        score_sum=Sum('reviews__score', default=0),
+        score_count=Count('reviews'),
+        score_avg=Avg('reviews__score'),
+    ).filter(score_count__gt=0)
+    for title in titles.iterator():
+        Title.objects.filter(pk=title.pk).update(
+            rating_sum=title.score_sum,
+            rating_count=title.score_count,
+            rating=title.score_avg,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_remove_title_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
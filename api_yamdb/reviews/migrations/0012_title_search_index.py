@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# DDL и заполнение индекса записаны здесь, а не взяты из reviews.search:
+# правки приложения не должны менять историческую миграцию
+TABLE = 'reviews_title_fts'
+
+
+def normalize(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def create_title_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Title = apps.get_model('reviews', 'Title')
+    rows = (
+        (pk, normalize(name), normalize(description))
+        for pk, name, description in Title.objects.using(
+            connection.alias
+        ).values_list('pk', 'name', 'description').iterator()
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} '
+            "USING fts5(name, description, tokenize='unicode61')"
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLE}({TABLE}, rank) "
+            "VALUES ('rank', 'bm25(10.0, 1.0)')"
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE}(rowid, name, description) '
+            'VALUES (%s, %s, %s)',
+            rows,
+        )
+
+
+def drop_title_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0011_title_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_index, drop_title_index),
+    ]
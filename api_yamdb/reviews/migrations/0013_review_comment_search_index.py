@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# DDL и заполнение индексов записаны здесь, а не взяты из reviews.search:
+# правки приложения не должны менять историческую миграцию
+INDEXES = (
+    ('reviews_review_fts', 'Review'),
+    ('reviews_comment_fts', 'Comment'),
+)
+
+
+def normalize(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def create_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    for table, model_name in INDEXES:
+        model = apps.get_model('reviews', model_name)
+        rows = (
+            (pk, normalize(text))
+            for pk, text in model.objects.using(
+                connection.alias
+            ).values_list('pk', 'text').iterator()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {table} '
+                "USING fts5(text, tokenize='unicode61')"
+            )
+            cursor.execute(
+                f"INSERT INTO {table}({table}, rank) "
+                "VALUES ('rank', 'bm25(1.0)')"
+            )
+            cursor.executemany(
+                f'INSERT INTO {table}(rowid, text) VALUES (%s, %s)', rows
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for table, _ in INDEXES:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_title_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 import api_yamdb.constants as constants
@@ -60,6 +60,8 @@ class Genre(models.Model):
 
 
 class Title(models.Model):
+    RATING_FIELDS = ('rating_sum', 'rating_count', 'rating')
+
     name = models.CharField(
         max_length=constants.TITLE_NAME_MAX_LENGTH,
         verbose_name='Название произведения',
@@ -85,16 +87,50 @@ class Title(models.Model):
         verbose_name='Категория',
         null=True,
         blank=True,
+        # Отдельный индекс не нужен: его заменяет title_category_name_idx
+        db_index=False,
+    )
+    # Рейтинг хранится денормализованно и поддерживается сигналами
+    # отзывов (см. reviews/ratings.py), чтобы не считать Avg на каждый запрос
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Сумма оценок'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Количество оценок'
+    )
+    rating = models.FloatField(
+        null=True, blank=True, editable=False, verbose_name='Рейтинг'
     )
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ['name']
+        indexes = [
+            # Список произведений всегда упорядочен по названию, а фильтры
+            # по году и категории сочетаются с этим порядком
+            models.Index(fields=['name'], name='title_name_idx'),
+            models.Index(fields=['year', 'name'], name='title_year_name_idx'),
+            models.Index(
+                fields=['category', 'name'], name='title_category_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Поля рейтинга меняются только через reviews.ratings, поэтому при
+        # обновлении произведения их не перезаписываем устаревшими значениями
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Review(models.Model):
     title = models.ForeignKey(
@@ -102,6 +138,8 @@ class Review(models.Model):
         on_delete=models.CASCADE,
         related_name='reviews',
         verbose_name='Произведение',
+        # Покрыт индексом review_title_pub_date_idx
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -128,7 +166,14 @@ class Review(models.Model):
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            # Список отзывов произведения и курсорная пагинация по нему
+            models.Index(
+                fields=['title', '-pub_date', '-id'],
+                name='review_title_pub_date_idx',
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['title', 'author'], name='unique_title_author'
@@ -138,6 +183,12 @@ class Review(models.Model):
     def __str__(self):
         return f'Отзыв от {self.author.username} на "{self.title.name}"'
 
+    def save(self, *args, **kwargs):
+        # Рейтинг произведения обновляется в post_save, поэтому запись
+        # отзыва и пересчёт рейтинга должны попасть в одну транзакцию
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -145,6 +196,8 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments',
         verbose_name='Отзыв',
+        # Покрыт индексом comment_review_pub_date_idx
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -160,7 +213,14 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            # Список комментариев отзыва и курсорная пагинация по нему
+            models.Index(
+                fields=['review', '-pub_date', '-id'],
+                name='comment_review_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'Комментарий от {self.author.username}'
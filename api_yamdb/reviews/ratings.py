@@ -0,0 +1,93 @@
+import math
+
+from django.db import transaction
+from django.db.models import (Avg, Case, Count, F, FloatField, Sum, Value,
+                              When)
+from django.db.models.functions import Cast
+
+from reviews.models import Title
+
+
+def average_rating(score_delta=0, count_delta=0):
+    """Средняя оценка по сумме и числу отзывов с учётом приращений.
+
+    В UPDATE правые части видят значения до изменения, поэтому новые
+    сумма и число считаются прямо в выражении.
+    """
+    new_sum = F('rating_sum') + Value(score_delta)
+    new_count = F('rating_count') + Value(count_delta)
+    return Case(
+        When(rating_count=-count_delta, then=None),
+        default=Cast(new_sum, FloatField()) / new_count,
+        output_field=FloatField(),
+    )
+
+
+def apply_score_delta(title_id, score_delta, count_delta):
+    """Инкрементально обновляет сохранённый рейтинг произведения.
+
+    Изменение выполняется выражениями F() на стороне БД, поэтому
+    параллельные отзывы не затирают друг друга.
+    """
+    if not score_delta and not count_delta:
+        return
+    # Сумма, число и средняя оценка меняются одной командой UPDATE
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F('rating_sum') + score_delta,
+        rating_count=F('rating_count') + count_delta,
+        rating=average_rating(score_delta, count_delta),
+    )
+
+
+def expected_ratings(title_ids=None):
+    """Рейтинги, посчитанные заново по таблице отзывов."""
+    titles = Title.objects.order_by()
+    if title_ids is not None:
+        titles = titles.filter(pk__in=title_ids)
+    return titles.annotate(
+        expected_sum=Sum('reviews__score', default=0),
+        expected_count=Count('reviews'),
+        expected_rating=Avg('reviews__score'),
+    ).values(
+        'pk',
+        'rating_sum',
+        'rating_count',
+        'rating',
+        'expected_sum',
+        'expected_count',
+        'expected_rating',
+    )
+
+
+def ratings_differ(stored, expected):
+    if stored is None or expected is None:
+        return stored is not expected
+    return not math.isclose(stored, expected)
+
+
+def find_rating_mismatches(title_ids=None):
+    """Возвращает id произведений с рассинхронизированным рейтингом."""
+    return [
+        row['pk']
+        for row in expected_ratings(title_ids)
+        if row['rating_sum'] != row['expected_sum']
+        or row['rating_count'] != row['expected_count']
+        or ratings_differ(row['rating'], row['expected_rating'])
+    ]
+
+
+@transaction.atomic
+def rebuild_ratings(title_ids=None):
+    """Пересчитывает сохранённый рейтинг по таблице отзывов.
+
+    Возвращает количество исправленных произведений.
+    """
+    mismatched = find_rating_mismatches(title_ids)
+    rows = {row['pk']: row for row in expected_ratings(mismatched)}
+    for pk, row in rows.items():
+        Title.objects.filter(pk=pk).update(
+            rating_sum=row['expected_sum'],
+            rating_count=row['expected_count'],
+            rating=row['expected_rating'],
+        )
+    return len(rows)
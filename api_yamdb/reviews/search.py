@@ -0,0 +1,190 @@
+"""Полнотекстовый поиск на SQLite FTS5.
+
+Для модели заводится виртуальная таблица FTS5, rowid которой совпадает с
+первичным ключом объекта. В индекс попадает нормализованный текст
+(нижний регистр, «ё» заменена на «е»): токенизатор unicode61 сам не
+считает «ё» и «е» одной буквой. Тем же образом нормализуется и запрос.
+Индекс обновляется сигналами при сохранении и удалении объектов, а после
+массовых операций (load_data, flush) пересобирается целиком.
+
+На других СУБД поиск сводится к icontains по тем же полям.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def build_match_expression(query):
+    """Запрос пользователя в выражение MATCH: все слова, как префиксы."""
+    return ' '.join(
+        f'"{token}"*' for token in TOKEN_RE.findall(normalize_text(query))
+    )
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+class SearchIndex:
+    """Индекс FTS5 по текстовым полям модели.
+
+    Саму таблицу и веса полей в ранжировании bm25 создают миграции
+    (0012, 0013).
+    """
+
+    def __init__(self, table, model_label, fields):
+        self.table = table
+        self.model_label = model_label
+        self.fields = fields
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def row(self, values):
+        return [normalize_text(values[field]) for field in self.fields]
+
+    def index(self, instance):
+        if not search_available():
+            return
+        values = {field: getattr(instance, field) for field in self.fields}
+        placeholders = ', '.join(['%s'] * (len(self.fields) + 1))
+        with connection.cursor() as cursor:
+            # FTS5 поддерживает REPLACE по rowid: одна команда и для новых,
+            # и для изменённых объектов
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {self.table}'
+                f'(rowid, {", ".join(self.fields)}) VALUES ({placeholders})',
+                [instance.pk, *self.row(values)],
+            )
+
+    def remove(self, pk):
+        if not search_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+
+    def rebuild(self, batch_size=1000):
+        """Пересобирает индекс по всем объектам модели."""
+        if not search_available():
+            return 0
+        columns = ', '.join(self.fields)
+        placeholders = ', '.join(['%s'] * (len(self.fields) + 1))
+        insert = (
+            f'INSERT INTO {self.table}(rowid, {columns}) '
+            f'VALUES ({placeholders})'
+        )
+        indexed = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            values = self.model.objects.order_by().values(
+                'pk', *self.fields
+            )
+            batch = []
+            for item in values.iterator(chunk_size=batch_size):
+                batch.append([item['pk'], *self.row(item)])
+                if len(batch) >= batch_size:
+                    cursor.executemany(insert, batch)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+                indexed += len(batch)
+        return indexed
+
+    def is_in_sync(self):
+        """Грубая проверка: совпадает ли число строк индекса и модели."""
+        if (
+            not search_available()
+            or self.table not in connection.introspection.table_names()
+        ):
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            (indexed,) = cursor.fetchone()
+        return indexed == self.model.objects.count()
+
+    def match(self, query, field='pk'):
+        """Условие «field входит в результаты поиска» без ранжирования.
+
+        Подходит для сочетания с другими условиями через | и для
+        запросов со своим порядком (курсорная пагинация, админка).
+        """
+        expression = build_match_expression(query)
+        if not expression:
+            return Q(**{f'{field}__in': []})
+        if not search_available():
+            prefix = '' if field == 'pk' else f'{field}__'
+            return reduce(or_, (
+                Q(**{f'{prefix}{name}__icontains': query})
+                for name in self.fields
+            ))
+        return Q(**{f'{field}__in': RawSQL(
+            f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s',
+            [expression],
+        )})
+
+    def filter(self, queryset, query):
+        """Оставляет объекты, подходящие под запрос, по убыванию
+        релевантности."""
+        expression = build_match_expression(query)
+        if not expression:
+            return queryset.none()
+        if not search_available():
+            return queryset.filter(reduce(or_, (
+                Q(**{f'{field}__icontains': query}) for field in self.fields
+            )))
+        opts = queryset.model._meta
+        pk_column = f'"{opts.db_table}"."{opts.pk.column}"'
+        ordering = [
+            field for field in queryset.query.order_by
+            if isinstance(field, str) and field.lstrip('-') != 'search_rank'
+        ]
+        rank = RawSQL(
+            f'SELECT rank FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = {pk_column}',
+            [expression],
+            output_field=FloatField(),
+        )
+        return queryset.filter(self.match(query)).annotate(
+            search_rank=rank
+        ).order_by('search_rank', *ordering)
+
+
+title_index = SearchIndex(
+    table='reviews_title_fts',
+    model_label='reviews.Title',
+    fields=('name', 'description'),
+)
+review_index = SearchIndex(
+    table='reviews_review_fts',
+    model_label='reviews.Review',
+    fields=('text',),
+)
+comment_index = SearchIndex(
+    table='reviews_comment_fts',
+    model_label='reviews.Comment',
+    fields=('text',),
+)
+SEARCH_INDEXES = (title_index, review_index, comment_index)
+
+
+def sync_search_indexes(**kwargs):
+    """Пересобирает рассинхронизированные индексы после migrate и flush.
+
+    flush очищает таблицы моделей, но не виртуальные таблицы FTS5.
+    """
+    for search_index in SEARCH_INDEXES:
+        if not search_index.is_in_sync():
+            search_index.rebuild()
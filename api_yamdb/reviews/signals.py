@@ -0,0 +1,91 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from api_yamdb.versions import (CATALOG, CATEGORIES, GENRES, REVIEWS,
+                                bump_version)
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import apply_score_delta
+from reviews.search import SEARCH_INDEXES
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_score(sender, instance, **kwargs):
+    instance._previous_score = None
+    if not instance._state.adding:
+        # Review.save работает в транзакции: блокировка строки не даёт
+        # параллельному изменению прочитать ту же старую оценку и
+        # применить к рейтингу своё приращение от неё же
+        instance._previous_score = (
+            Review.objects.select_for_update()
+            .filter(pk=instance.pk)
+            .values_list('score', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_score = getattr(instance, '_previous_score', None)
+    if created or previous_score is None:
+        apply_score_delta(instance.title_id, int(instance.score), 1)
+    else:
+        apply_score_delta(
+            instance.title_id, int(instance.score) - previous_score, 0
+        )
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    apply_score_delta(instance.title_id, -int(instance.score), -1)
+
+
+INDEX_BY_MODEL = {
+    search_index.model: search_index for search_index in SEARCH_INDEXES
+}
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        INDEX_BY_MODEL[sender].index(instance)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(sender, instance, **kwargs):
+    INDEX_BY_MODEL[sender].remove(instance.pk)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_catalog_version(sender, **kwargs):
+    bump_version(CATALOG)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_categories_version(sender, **kwargs):
+    bump_version(CATEGORIES)
+    bump_version(CATALOG)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def bump_genres_version(sender, **kwargs):
+    bump_version(GENRES)
+    bump_version(CATALOG)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_reviews_version(sender, **kwargs):
+    bump_version(REVIEWS)
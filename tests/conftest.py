@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 
@@ -29,3 +31,18 @@ if FILENAME not in project_dir_content:
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш живёт дольше тестовой БД, поэтому очищаем его между тестами."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def sync_confirmation_email(settings):
+    """Тесты регистрации проверяют mail.outbox сразу после запроса."""
+    settings.CONFIRMATION_EMAIL_ASYNC = False
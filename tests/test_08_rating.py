@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.models import Review, Title
+from tests.utils import create_reviews, create_single_review
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08StoredRating:
+
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+    REVIEW_DETAIL_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/'
+    )
+
+    def get_rating(self, client, title_id):
+        response = client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        )
+        assert response.status_code == HTTPStatus.OK
+        return response.json()['rating']
+
+    def test_01_rating_follows_review_changes(self, client, admin_client,
+                                              admin, user, user_client):
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client}
+        )
+        title_id = titles[0]['id']
+        assert self.get_rating(client, title_id) == 5, (
+            'Проверьте, что рейтинг произведения обновляется при создании '
+            'отзыва.'
+        )
+
+        create_single_review(user_client, title_id, 'second', 2)
+        assert self.get_rating(client, title_id) == 3.5, (
+            'Проверьте, что рейтинг равен средней оценке всех отзывов.'
+        )
+
+        url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=reviews[0]['id']
+        )
+        admin_client.patch(url, data={'score': 9})
+        assert self.get_rating(client, title_id) == 5.5, (
+            'Проверьте, что рейтинг пересчитывается при изменении оценки.'
+        )
+
+        admin_client.delete(url)
+        assert self.get_rating(client, title_id) == 2, (
+            'Проверьте, что рейтинг пересчитывается при удалении отзыва.'
+        )
+
+        user.delete()
+        assert self.get_rating(client, title_id) is None, (
+            'Если у произведения не осталось отзывов - рейтинг должен '
+            'быть `None`.'
+        )
+
+    def test_02_rebuild_ratings_command(self, admin_client, admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id = titles[0]['id']
+        Title.objects.filter(pk=title_id).update(
+            rating_sum=0, rating_count=0, rating=None
+        )
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+
+        call_command('rebuild_ratings')
+        call_command('rebuild_ratings', '--check')
+        title = Title.objects.get(pk=title_id)
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            5, 1, 5
+        )
+        assert Review.objects.filter(title_id=title_id).count() == 1
+
+    def test_03_check_detects_drifted_average(self, admin_client, admin):
+        _, titles = create_reviews(admin_client, {admin: admin_client})
+        title_id = titles[0]['id']
+        Title.objects.filter(pk=title_id).update(rating=1)
+
+        with pytest.raises(CommandError):
+            call_command('rebuild_ratings', '--check')
+
+        call_command('rebuild_ratings')
+        assert Title.objects.get(pk=title_id).rating == 5
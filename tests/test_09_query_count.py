@@ -0,0 +1,318 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+import api_yamdb.constants as constants
+from reviews.models import Review, Title
+from tests.utils import create_catalog
+
+
+@pytest.mark.django_db
+class Test09TitleQueryCount:
+
+    TITLES_URL = '/api/v1/titles/'
+    TITLE_DETAIL_URL_TEMPLATE = '/api/v1/titles/{title_id}/'
+
+    @pytest.mark.parametrize('size', (5, 30))
+    def test_01_title_list(self, client, django_assert_num_queries, size):
+        create_catalog(size)
+        # COUNT, страница произведений с категорией, prefetch жанров
+        with django_assert_num_queries(3):
+            response = client.get(self.TITLES_URL)
+        assert len(response.json()['results']) == min(size, 20)
+
+    def test_02_title_filtered_list(self, client, django_assert_num_queries):
+        create_catalog(30)
+        with django_assert_num_queries(3):
+            response = client.get(
+                self.TITLES_URL, {'genre': 'drama', 'category': 'films'}
+            )
+        assert response.json()['count'] == 30
+
+    def test_03_title_retrieve(self, client, django_assert_num_queries):
+        create_catalog(3)
+        title = Title.objects.first()
+        with django_assert_num_queries(2):
+            response = client.get(
+                self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title.id)
+            )
+        assert len(response.json()['genre']) == 2
+
+    def test_04_title_write_representation(self, admin_client,
+                                           django_assert_num_queries):
+        create_catalog(30)
+        data = {
+            'name': 'Новое произведение',
+            'year': 2001,
+            'genre': ['drama', 'comedy'],
+            'category': 'films',
+        }
+        # Пользователь, два жанра и категория по slug, INSERT произведения
+        # и его строки в поисковом индексе, связь с жанрами (3 запроса
+        # из-за m2m_changed) и жанры для ответа
+        with django_assert_num_queries(10):
+            response = admin_client.post(self.TITLES_URL, data=data)
+        assert len(response.json()['genre']) == 2
+
+        url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=response.json()['id']
+        )
+        # Произведение с категорией, жанры, UPDATE, строка поискового
+        # индекса и жанры для ответа; пользователь уже в кэше после POST
+        with django_assert_num_queries(5):
+            response = admin_client.patch(url, data={'year': 2002})
+        assert response.json()['category']['slug'] == 'films'
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09SignUpQueryCount:
+
+    SIGNUP_URL = '/api/v1/auth/signup/'
+
+    def test_01_new_user(self, client, django_assert_num_queries):
+        data = {'username': 'newuser', 'email': 'newuser@yamdb.fake'}
+        # Одна выборка по username/email, INSERT пользователя и INSERT
+        # кода (плюс BEGIN/COMMIT вокруг них)
+        with django_assert_num_queries(5):
+            response = client.post(self.SIGNUP_URL, data=data)
+        assert response.status_code == HTTPStatus.OK
+
+    def test_02_existing_user(self, client, user, django_assert_num_queries):
+        data = {'username': user.username, 'email': user.email}
+        # Выборка и upsert кода без записи в строку пользователя
+        # (bulk_create оборачивает upsert в BEGIN/COMMIT)
+        with django_assert_num_queries(4):
+            response = client.post(self.SIGNUP_URL, data=data)
+        assert response.status_code == HTTPStatus.OK
+
+    def test_03_occupied_fields(self, client, user, admin,
+                                django_assert_num_queries):
+        data = {'username': user.username, 'email': admin.email}
+        with django_assert_num_queries(1):
+            response = client.post(self.SIGNUP_URL, data=data)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert set(response.json()) == {'username', 'email'}
+
+
+@pytest.mark.django_db
+class Test09ReviewCreateQueries:
+
+    def test_01_review_create_without_precheck(self, user_client):
+        create_catalog(1)
+        title = Title.objects.get()
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        data = {'text': 'Отзыв', 'score': 7}
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(url, data=data)
+        assert response.status_code == HTTPStatus.CREATED
+        # Уникальность проверяет ограничение БД, а не отдельный SELECT
+        assert not [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "reviews_review"' in query['sql']
+        ]
+
+    def test_02_duplicate_review_rejected(self, user_client):
+        create_catalog(1)
+        title = Title.objects.get()
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        assert user_client.post(
+            url, data={'text': 'Первый', 'score': 5}
+        ).status_code == HTTPStatus.CREATED
+        response = user_client.post(url, data={'text': 'Второй', 'score': 9})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {
+            'non_field_errors': [constants.REVIEW_ALREADY_EXISTS_ERROR]
+        }
+        title.refresh_from_db()
+        assert (title.rating_count, title.rating) == (1, 5)
+
+    def test_03_other_integrity_errors_not_masked(self, user_client,
+                                                  monkeypatch):
+        create_catalog(1)
+        title = Title.objects.get()
+
+        def broken_save(*args, **kwargs):
+            raise IntegrityError('NOT NULL constraint failed')
+
+        monkeypatch.setattr(Review, 'save', broken_save)
+        with pytest.raises(IntegrityError):
+            user_client.post(
+                f'/api/v1/titles/{title.id}/reviews/',
+                data={'text': 'Отзыв', 'score': 7},
+            )
+
+
+@pytest.mark.django_db
+class Test09NestedResourceQueries:
+
+    @staticmethod
+    def parent_queries(context, table):
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{table}"' in query['sql']
+        ]
+
+    def test_01_parent_checked_once(self, user_client, user):
+        create_catalog(2)
+        title, empty_title = Title.objects.all()
+        review = title.reviews.create(text='Отзыв', score=5, author=user)
+        review_url = f'/api/v1/titles/{title.id}/reviews/'
+        comments_url = f'{review_url}{review.id}/comments/'
+        with CaptureQueriesContext(connection) as context:
+            assert user_client.get(review_url).status_code == HTTPStatus.OK
+        assert not self.parent_queries(context, 'reviews_title'), (
+            'Непустая страница списка не требует проверки родителя.'
+        )
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(
+                f'/api/v1/titles/{empty_title.id}/reviews/'
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['results'] == []
+        assert len(self.parent_queries(context, 'reviews_title')) == 1
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(comments_url, data={'text': 'Да'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert len(self.parent_queries(context, 'reviews_review')) == 1
+
+    def test_02_detail_without_parent_lookup(self, user_client, user):
+        create_catalog(1)
+        title = Title.objects.get()
+        review = title.reviews.create(text='Отзыв', score=5, author=user)
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        with CaptureQueriesContext(connection) as context:
+            assert user_client.get(url).status_code == HTTPStatus.OK
+        assert not self.parent_queries(context, 'reviews_title')
+
+    def test_03_missing_or_foreign_parent(self, user_client, user):
+        create_catalog(2)
+        title, other_title = Title.objects.all()
+        review = title.reviews.create(text='Отзыв', score=5, author=user)
+        comment = review.comments.create(text='Комментарий', author=user)
+        missing_title_id = other_title.id + 1
+        for url in (
+            f'/api/v1/titles/{missing_title_id}/reviews/',
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/',
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/comments/',
+            f'/api/v1/titles/{other_title.id}/reviews/{review.id}/'
+            f'comments/{comment.id}/',
+        ):
+            assert user_client.get(url).status_code == HTTPStatus.NOT_FOUND
+        response = user_client.post(
+            f'/api/v1/titles/{missing_title_id}/reviews/',
+            data={'text': 'Отзыв', 'score': 5},
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+class Test09ReviewCommentAuthorQueries:
+
+    AUTHORS = 5
+
+    @pytest.fixture
+    def review_tree(self, django_user_model):
+        create_catalog(1)
+        title = Title.objects.get()
+        authors = [
+            django_user_model.objects.create_user(
+                username=f'author_{number}',
+                email=f'author_{number}@yamdb.fake',
+            )
+            for number in range(self.AUTHORS)
+        ]
+        reviews = [
+            title.reviews.create(text='Отзыв', score=5, author=author)
+            for author in authors
+        ]
+        for author in authors:
+            reviews[0].comments.create(text='Комментарий', author=author)
+        return title, reviews[0]
+
+    def test_01_review_list_and_detail(self, client, review_tree,
+                                       django_assert_num_queries):
+        title, review = review_tree
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        # COUNT и страница отзывов с авторами; непустая страница не
+        # требует проверки произведения
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert {
+            item['author'] for item in response.json()['results']
+        } == {f'author_{number}' for number in range(self.AUTHORS)}
+        with django_assert_num_queries(1):
+            response = client.get(f'{url}{review.id}/')
+        assert response.json()['author'] == 'author_0'
+
+    def test_02_comment_list_and_detail(self, client, review_tree,
+                                        django_assert_num_queries):
+        title, review = review_tree
+        url = f'/api/v1/titles/{title.id}/reviews/{review.id}/comments/'
+        with django_assert_num_queries(2):
+            response = client.get(url)
+        assert len(response.json()['results']) == self.AUTHORS
+        comment = review.comments.first()
+        with django_assert_num_queries(1):
+            response = client.get(f'{url}{comment.id}/')
+        assert response.json()['author'] == comment.author.username
+
+    def test_03_write_responses(self, user_client, user, review_tree,
+                                django_assert_num_queries):
+        title, review = review_tree
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        # Прогреваем кэш аутентифицированного пользователя
+        user_client.get(url)
+        # Проверка произведения, INSERT отзыва, один UPDATE рейтинга и
+        # строка поискового индекса в точке сохранения Review.save; автор
+        # для ответа берётся из запроса, а не перечитывается
+        with django_assert_num_queries(6):
+            response = user_client.post(url, data={'text': 'Мой', 'score': 8})
+        assert response.json()['author'] == user.username
+        # Отзыв вместе с автором, прежняя оценка, UPDATE и строка
+        # поискового индекса в точке сохранения; оценка не менялась,
+        # рейтинг не пересчитывается
+        with django_assert_num_queries(6):
+            response = user_client.patch(
+                f'{url}{response.json()["id"]}/', data={'text': 'Новый'}
+            )
+        assert response.json()['author'] == user.username
+
+
+@pytest.mark.django_db
+class Test09PermissionQueries:
+
+    @pytest.fixture
+    def urls(self, admin):
+        create_catalog(1)
+        title = Title.objects.get()
+        review = title.reviews.create(text='Отзыв', score=5, author=admin)
+        comment = review.comments.create(text='Комментарий', author=admin)
+        review_url = f'/api/v1/titles/{title.id}/reviews/{review.id}/'
+        return review_url, f'{review_url}comments/{comment.id}/'
+
+    def test_01_foreign_object_rejected(self, user_client, urls,
+                                        django_assert_num_queries):
+        # Прогреваем кэш аутентифицированного пользователя
+        user_client.get(urls[0])
+        for url in urls:
+            # Только выборка объекта: автор сравнивается по author_id
+            with django_assert_num_queries(1):
+                response = user_client.patch(url, data={'text': 'Чужой'})
+            assert response.status_code == HTTPStatus.FORBIDDEN
+            with django_assert_num_queries(1):
+                response = user_client.delete(url)
+            assert response.status_code == HTTPStatus.FORBIDDEN
+
+    def test_02_anonymous_rejected_before_lookup(self, client, urls,
+                                                 django_assert_num_queries):
+        for url in urls:
+            with django_assert_num_queries(0):
+                response = client.patch(url, data={'text': 'Аноним'})
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
+            with django_assert_num_queries(0):
+                response = client.delete(url)
+            assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import shutil
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.serializers import TokenSerializer
+from mdb_users.models import User
+from reviews.management.commands.load_data import (
+    CHECKPOINT_FILE_NAME, file_signature
+)
+from reviews.models import Comment, Genre, Review, Title
+from reviews.ratings import find_rating_mismatches
+from tests.conftest import MANAGE_PATH
+
+DATA_PATH = os.path.join(MANAGE_PATH, 'static', 'data', '')
+USERS_URL = '/api/v1/users/'
+
+
+def count_csv_rows(file_name):
+    with open(os.path.join(DATA_PATH, file_name), encoding='utf-8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10LoadData:
+
+    @pytest.fixture
+    def checkpoint(self, tmp_path):
+        # Контрольная точка не должна попадать в каталог с данными репозитория
+        return f'--checkpoint={tmp_path / CHECKPOINT_FILE_NAME}'
+
+    def load(self, checkpoint, *args):
+        out = StringIO()
+        call_command(
+            'load_data', f'--path={DATA_PATH}', checkpoint, *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_01_load_all_files(self, django_user_model, checkpoint):
+        output = self.load(checkpoint, '--chunk-size=10')
+        assert Title.objects.count() == count_csv_rows('titles.csv')
+        assert Genre.objects.count() == count_csv_rows('genre.csv')
+        assert django_user_model.objects.count() == count_csv_rows(
+            'users.csv'
+        )
+        assert Title.genre.through.objects.count() == count_csv_rows(
+            'genre_title.csv'
+        )
+        assert Review.objects.count() == count_csv_rows('review.csv')
+        assert Comment.objects.count() == count_csv_rows('comments.csv')
+        assert 'rows/s' in output, (
+            'Команда `load_data` должна сообщать скорость загрузки.'
+        )
+        assert not find_rating_mismatches(), (
+            'После загрузки отзывов рейтинги произведений должны быть '
+            'пересчитаны.'
+        )
+
+    def test_02_reload_is_idempotent(self, checkpoint):
+        self.load(checkpoint)
+        self.load(checkpoint)
+        assert Review.objects.count() == count_csv_rows('review.csv')
+        assert Title.genre.through.objects.count() == count_csv_rows(
+            'genre_title.csv'
+        )
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        for file_name in os.listdir(DATA_PATH):
+            shutil.copy(os.path.join(DATA_PATH, file_name), tmp_path)
+        return tmp_path
+
+    def load_from(self, data_dir, *args):
+        out, err = StringIO(), StringIO()
+        call_command(
+            'load_data', f'--path={data_dir}/', *args, stdout=out, stderr=err
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_03_bad_row_does_not_roll_back_other_files(self, data_dir):
+        with open(data_dir / 'comments.csv', 'a', encoding='utf-8') as f:
+            f.write('\nnot-a-number,1,broken,100,2020-01-13T23:20:02.422Z')
+        _, errors = self.load_from(data_dir)
+        assert 'not-a-number' in errors
+        assert Review.objects.count() == count_csv_rows('review.csv')
+        assert Comment.objects.count() == count_csv_rows('comments.csv')
+        assert not (data_dir / CHECKPOINT_FILE_NAME).exists(), (
+            'После успешной загрузки файл контрольной точки удаляется.'
+        )
+
+    def test_04_resume_from_checkpoint(self, data_dir):
+        committed = 10
+        checkpoint = {
+            'review.csv': {
+                'rows': committed,
+                'signature': file_signature(data_dir / 'review.csv'),
+            },
+        }
+        (data_dir / CHECKPOINT_FILE_NAME).write_text(json.dumps(checkpoint))
+        output, _ = self.load_from(data_dir)
+        assert f'after row {committed}' in output
+        assert Review.objects.count() == (
+            count_csv_rows('review.csv') - committed
+        )
+        assert Title.objects.count() == count_csv_rows('titles.csv')
+
+    def test_05_upsert_updates_existing_rows(self, data_dir):
+        self.load_from(data_dir)
+        Title.objects.filter(pk=1).update(name='Изменено')
+
+        self.load_from(data_dir)
+        assert Title.objects.get(pk=1).name == 'Изменено', (
+            'Без `--upsert` существующие записи не перезаписываются.'
+        )
+
+        self.load_from(data_dir, '--upsert')
+        assert Title.objects.get(pk=1).name != 'Изменено', (
+            'С `--upsert` существующие записи обновляются данными из CSV.'
+        )
+
+    def test_07_upsert_role_change_revokes_claims(self, data_dir):
+        self.load_from(data_dir)
+        admin = User.objects.get(username='capt_obvious')
+        assert admin.role == User.ADMIN
+        token = TokenSerializer().create({'user': admin})['token']
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert client.get(USERS_URL).status_code == HTTPStatus.OK
+
+        users_csv = data_dir / 'users.csv'
+        users_csv.write_text(
+            users_csv.read_text(encoding='utf-8').replace(
+                'capt_obvious@yamdb.fake,admin', 'capt_obvious@yamdb.fake,user'
+            ),
+            encoding='utf-8',
+        )
+        self.load_from(data_dir, '--upsert')
+        demoted = User.objects.get(pk=admin.pk)
+        assert demoted.role == User.USER
+        assert demoted.token_version == admin.token_version + 1
+        assert client.get(USERS_URL).status_code == HTTPStatus.FORBIDDEN, (
+            'Смена роли через `load_data --upsert` должна делать '
+            'недостоверными claims уже выданных токенов.'
+        )
+
+    def test_06_parallel_workers(self, data_dir):
+        output, _ = self.load_from(data_dir, '--workers=2', '--chunk-size=7')
+        assert Review.objects.count() == count_csv_rows('review.csv')
+        assert Comment.objects.count() == count_csv_rows('comments.csv')
+        assert Title.genre.through.objects.count() == count_csv_rows(
+            'genre_title.csv'
+        )
+        assert 'Stage 4/4' in output, (
+            'Команда `load_data` должна выводить время каждой стадии.'
+        )
+        assert not find_rating_mismatches()
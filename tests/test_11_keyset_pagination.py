@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from reviews.models import Comment, Review, Title
+
+
+@pytest.fixture
+def title_with_reviews(django_user_model):
+    title = Title.objects.create(name='Произведение', year=2000)
+    authors = [
+        django_user_model.objects.create_user(
+            username=f'author{number}', email=f'author{number}@yamdb.fake'
+        )
+        for number in range(45)
+    ]
+    reviews = Review.objects.bulk_create(
+        Review(title=title, author=author, text='text', score=5)
+        for author in authors
+    )
+    comments = Comment.objects.bulk_create(
+        Comment(review=reviews[0], author=author, text='text')
+        for author in authors
+    )
+    # Разные даты публикации, чтобы курсор не упирался в одинаковые значения
+    now = timezone.now()
+    for number, (review, comment) in enumerate(zip(reviews, comments)):
+        pub_date = now - timedelta(minutes=number * 7 % 45)
+        Review.objects.filter(pk=review.pk).update(pub_date=pub_date)
+        Comment.objects.filter(pk=comment.pk).update(pub_date=pub_date)
+    return title, reviews[0]
+
+
+def collect_pages(client, url, link='next'):
+    ids, sql = [], []
+    while url:
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        data = response.json()
+        assert set(data) == {'next', 'previous', 'results'}, (
+            'В курсорном режиме ответ не должен содержать `count`.'
+        )
+        ids.extend(item['id'] for item in data['results'])
+        sql.extend(query['sql'].upper() for query in queries)
+        url = data[link]
+    return ids, sql
+
+
+@pytest.mark.django_db
+class Test11KeysetPagination:
+
+    REVIEWS_URL_TEMPLATE = '/api/v1/titles/{title_id}/reviews/'
+    COMMENTS_URL_TEMPLATE = (
+        '/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+    )
+
+    def test_01_page_number_is_default(self, client, title_with_reviews):
+        title, _ = title_with_reviews
+        response = client.get(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        )
+        assert response.json()['count'] == 45
+
+    @pytest.mark.parametrize('kind', ('reviews', 'comments'))
+    def test_02_cursor_mode_walks_all_items(self, client, title_with_reviews,
+                                            kind):
+        title, review = title_with_reviews
+        if kind == 'reviews':
+            url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+            expected = Review.objects.filter(title=title)
+        else:
+            url = self.COMMENTS_URL_TEMPLATE.format(
+                title_id=title.id, review_id=review.id
+            )
+            expected = Comment.objects.filter(review=review)
+        ids, sql = collect_pages(client, f'{url}?pagination=cursor')
+        assert ids == list(
+            expected.order_by('-pub_date', '-id').values_list('id', flat=True)
+        ), (
+            'Курсорная пагинация должна отдавать все объекты по одному '
+            'разу в порядке `-pub_date`.'
+        )
+        assert not any('COUNT(' in query for query in sql)
+        assert not any('OFFSET' in query for query in sql)
+
+    def test_03_equal_pub_dates_without_offset(self, client,
+                                               title_with_reviews):
+        title, _ = title_with_reviews
+        # Как после load_data: у всех отзывов одна и та же дата
+        Review.objects.filter(title=title).update(pub_date=timezone.now())
+        expected = list(
+            Review.objects.filter(title=title)
+            .order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        ids, sql = collect_pages(client, f'{url}?pagination=cursor')
+        assert ids == expected
+        assert not any('OFFSET' in query for query in sql)
+
+        # Обратно по ссылкам previous с последней страницы
+        last_page = client.get(f'{url}?pagination=cursor')
+        while last_page.json()['next']:
+            last_page = client.get(last_page.json()['next'])
+        previous_ids, sql = collect_pages(
+            client, last_page.json()['previous'], link='previous'
+        )
+        # Страницы по 20 объектов: вторая, затем первая
+        assert previous_ids == expected[20:40] + expected[:20]
+        assert not any('OFFSET' in query for query in sql)
+
+    def test_04_invalid_cursor(self, client, title_with_reviews):
+        title, _ = title_with_reviews
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        response = client.get(
+            f'{url}?pagination=cursor&cursor=cD1icm9rZW4%3D'
+        )
+        assert response.status_code == 404
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Title
+from tests.utils import create_catalog
+
+
+def count_queries(queries):
+    return sum('COUNT(' in query['sql'].upper() for query in queries)
+
+
+@pytest.mark.django_db
+class Test12CatalogPagination:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def get(self, client, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.TITLES_URL, params or {})
+        return response.json(), count_queries(queries)
+
+    def test_01_count_is_cached_per_filter(self, client):
+        category, _ = create_catalog(25)
+        data, counts = self.get(client)
+        assert (data['count'], counts) == (25, 1)
+
+        data, counts = self.get(client, {'page': 2})
+        assert (data['count'], counts) == (25, 0), (
+            'Повторный запрос того же списка не должен выполнять COUNT(*).'
+        )
+
+        data, counts = self.get(client, {'year': 1999})
+        assert (data['count'], counts) == (0, 1), (
+            'Количество кэшируется отдельно для каждого набора фильтров.'
+        )
+
+        Title.objects.create(name='Новое', year=2000, category=category)
+        data, counts = self.get(client)
+        assert (data['count'], counts) == (26, 1), (
+            'После изменения каталога количество должно пересчитываться.'
+        )
+
+    def test_02_count_free_mode(self, client):
+        create_catalog(25)
+        data, counts = self.get(client, {'count': 'false'})
+        assert counts == 0
+        assert data['count'] is None
+        assert len(data['results']) == 20
+        assert data['previous'] is None
+        assert 'page=2' in data['next'] and 'count=false' in data['next']
+
+        data, counts = self.get(client, {'count': 'false', 'page': 2})
+        assert counts == 0
+        assert len(data['results']) == 5
+        assert data['next'] is None
+        assert 'page=' not in data['previous']
+
+        response = client.get(self.TITLES_URL, {'count': 'false', 'page': 3})
+        assert response.status_code == 404
@@ -0,0 +1,66 @@
+from http import HTTPStatus
+
+import pytest
+
+from api import mixins
+from reviews.models import Category, Genre
+
+
+@pytest.mark.django_db
+class Test13CategoryGenreListCache:
+
+    @pytest.mark.parametrize('url,model', (
+        ('/api/v1/categories/', Category),
+        ('/api/v1/genres/', Genre),
+    ))
+    def test_01_list_is_cached_until_change(self, client, admin_client,
+                                            django_assert_num_queries,
+                                            url, model):
+        model.objects.create(name='Первый', slug='first')
+        response = client.get(url)
+        assert response.json()['count'] == 1
+
+        with django_assert_num_queries(0):
+            cached = client.get(url)
+        assert cached.status_code == HTTPStatus.OK
+        assert cached.json() == response.json()
+
+        search = client.get(url, {'search': 'нет такого'})
+        assert search.json()['count'] == 0, (
+            'Ответы с разными параметрами поиска кэшируются отдельно.'
+        )
+
+        response = admin_client.post(url, data={'name': 'Второй',
+                                                'slug': 'second'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert client.get(url).json()['count'] == 2, (
+            'После добавления объекта закэшированный список должен '
+            'обновиться.'
+        )
+
+        response = admin_client.delete(f'{url}second/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert client.get(url).json()['count'] == 1, (
+            'После удаления объекта закэшированный список должен '
+            'обновиться.'
+        )
+
+
+class Test13LocalCache:
+
+    def test_01_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(mixins.time, 'monotonic', lambda: now[0])
+        cache = mixins.LocalCache(max_size=2, timeout=60)
+        cache.set('key', {'count': 1})
+        now[0] += 59
+        assert cache.get('key') == {'count': 1}
+        now[0] += 1
+        assert cache.get('key') is None, (
+            'Запись в памяти процесса не должна жить дольше timeout.'
+        )
+
+    def test_02_default_cache_is_shared(self, settings):
+        assert 'LocMemCache' not in settings.CACHES['default']['BACKEND'], (
+            'Версии коллекций должны храниться в кэше, общем для процессов.'
+        )
@@ -0,0 +1,98 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from django.utils.http import http_date
+
+from api import mixins
+from api_yamdb.versions import REVIEWS, get_version
+from reviews.models import Review, Title
+from tests.utils import create_catalog
+
+
+@pytest.fixture
+def next_second(monkeypatch):
+    """Часы ответа на пару секунд впереди последнего изменения."""
+    now = time.time() + 2
+    monkeypatch.setattr(mixins.time, 'time', lambda: now)
+
+
+@pytest.mark.django_db
+class Test14ConditionalGet:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_etag_not_modified(self, client, django_assert_num_queries):
+        create_catalog(3)
+        response = client.get(self.TITLES_URL)
+        etag = response.headers['ETag']
+
+        with django_assert_num_queries(0):
+            response = client.get(self.TITLES_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert not response.content
+
+        response = client.get(
+            self.TITLES_URL, {'page': 1}, HTTP_IF_NONE_MATCH=etag
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            'ETag должен зависеть от параметров запроса.'
+        )
+
+    def test_02_etag_changes_after_write(self, client, user):
+        create_catalog(2)
+        title = Title.objects.first()
+        url = f'{self.TITLES_URL}{title.id}/'
+        etag = client.get(url).headers['ETag']
+
+        Review.objects.create(title=title, author=user, text='text', score=7)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Новый отзыв меняет рейтинг, поэтому ETag произведения должен '
+            'измениться.'
+        )
+        assert response.json()['rating'] == 7
+
+    @pytest.mark.parametrize('url', ('/api/v1/categories/',
+                                     '/api/v1/genres/'))
+    def test_03_if_modified_since(self, client, url, next_second):
+        create_catalog(1)
+        last_modified = client.get(url).headers['Last-Modified']
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_04_review_list(self, client, user):
+        create_catalog(1)
+        title = Title.objects.first()
+        url = f'{self.TITLES_URL}{title.id}/reviews/'
+        etag = client.get(url).headers['ETag']
+        assert client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.NOT_MODIFIED
+
+        Review.objects.create(title=title, author=user, text='text', score=7)
+        assert client.get(
+            url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.OK
+
+    def test_05_errors_have_no_validators(self, client):
+        response = client.get(f'{self.TITLES_URL}999/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        assert 'ETag' not in response.headers
+
+    def test_06_no_last_modified_in_same_second(self, client, monkeypatch):
+        create_catalog(1)
+        title = Title.objects.first()
+        url = f'{self.TITLES_URL}{title.id}/reviews/'
+        changed_at = get_version(REVIEWS) / 10 ** 9
+        monkeypatch.setattr(mixins.time, 'time', lambda: changed_at)
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert 'Last-Modified' not in response.headers, (
+            'В секунду изменения Last-Modified не отдаётся: запись в ту же '
+            'секунду его бы не изменила.'
+        )
+
+        monkeypatch.setattr(mixins.time, 'time', lambda: changed_at + 1)
+        response = client.get(url)
+        assert response.headers['Last-Modified'] == http_date(changed_at)
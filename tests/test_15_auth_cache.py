@@ -0,0 +1,62 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+
+from mdb_users.authentication import user_cache_key
+
+
+@pytest.mark.django_db
+class Test15CachedAuthentication:
+
+    ME_URL = '/api/v1/users/me/'
+    USERS_URL = '/api/v1/users/'
+    CATEGORIES_URL = '/api/v1/categories/'
+
+    def test_01_user_is_not_read_on_every_request(
+            self, user_client, django_assert_num_queries):
+        assert user_client.get(self.ME_URL).status_code == HTTPStatus.OK
+        user_client.get(self.CATEGORIES_URL)
+        with django_assert_num_queries(0):
+            response = user_client.get(self.CATEGORIES_URL)
+        assert response.status_code == HTTPStatus.OK
+        # Профиль в кэше не хранится и читается одним запросом
+        with django_assert_num_queries(1):
+            response = user_client.get(self.ME_URL)
+        assert response.json()['role'] == 'user'
+
+    def test_02_role_change_is_visible_immediately(self, user, user_client,
+                                                   admin_client):
+        response = user_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = user_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'После смены роли закэшированный пользователь должен '
+            'обновиться.'
+        )
+
+    def test_03_deleted_user_is_rejected(self, user, user_client,
+                                         admin_client):
+        assert user_client.get(self.ME_URL).status_code == HTTPStatus.OK
+        admin_client.delete(f'{self.USERS_URL}{user.username}/')
+        response = user_client.get(self.ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_04_inactive_user_is_rejected(self, user, user_client):
+        assert user_client.get(self.ME_URL).status_code == HTTPStatus.OK
+        user.is_active = False
+        user.save()
+        response = user_client.get(self.ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_05_cache_holds_no_password(self, user, user_client):
+        assert user_client.get(self.ME_URL).status_code == HTTPStatus.OK
+        record = cache.get(user_cache_key(user.pk))
+        assert record['username'] == user.username
+        assert 'password' not in record
+        assert user.password not in map(str, record.values())
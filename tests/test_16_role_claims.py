@@ -0,0 +1,101 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.serializers import TokenSerializer
+from mdb_users.models import User
+
+
+def claims_client(user):
+    token = TokenSerializer().create({'user': user})['token']
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client, AccessToken(token)
+
+
+@pytest.mark.django_db
+class Test16RoleClaims:
+
+    USERS_URL = '/api/v1/users/'
+    CATEGORIES_URL = '/api/v1/categories/'
+
+    def test_01_token_contains_role_claims(self, admin):
+        _, token = claims_client(admin)
+        assert token['role'] == 'admin'
+        assert token['is_superuser'] is False
+        assert token['ver'] == admin.token_version
+
+    def test_02_reads_are_authorized_without_user_query(
+            self, admin, django_assert_num_queries):
+        client, _ = claims_client(admin)
+        client.get(self.CATEGORIES_URL)
+        # Список категорий закэширован, пользователь собран из токена
+        with django_assert_num_queries(0):
+            response = client.get(self.CATEGORIES_URL)
+        assert response.status_code == HTTPStatus.OK
+
+        response = client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Роль администратора из токена должна давать доступ к списку '
+            'пользователей.'
+        )
+
+    def test_03_role_change_invalidates_claims(self, admin, admin_client,
+                                               user):
+        client, _ = claims_client(user)
+        assert client.get(self.USERS_URL).status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+        version = user.token_version
+        admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        user.refresh_from_db()
+        assert user.token_version == version + 1
+        assert client.get(self.USERS_URL).status_code == HTTPStatus.OK, (
+            'После смены роли токен со старыми claims не должен '
+            'использоваться для проверки прав.'
+        )
+
+        demoted_client, _ = claims_client(user)
+        user.role = 'user'
+        user.save()
+        assert demoted_client.get(self.USERS_URL).status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+
+    def test_04_me_and_writes_use_model_user(self, user):
+        client, _ = claims_client(user)
+        response = client.get(f'{self.USERS_URL}me/')
+        assert response.json()['email'] == user.email
+        response = client.patch(f'{self.USERS_URL}me/', data={'bio': 'new'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['bio'] == 'new'
+
+    def test_05_inactive_user_claims_rejected(self, user):
+        client, _ = claims_client(user)
+        user.is_active = False
+        user.save()
+        response = client.get(f'{self.USERS_URL}me/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    def test_06_deferred_loading_has_no_extra_queries(
+            self, admin, user, moderator, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            usernames = [
+                item.username for item in User.objects.only('username')
+            ]
+        assert len(usernames) == 3
+
+    def test_07_version_kept_without_claim_changes(self, user):
+        version = user.token_version
+        user.bio = 'Новое'
+        user.save()
+        assert user.token_version == version
+        user.role = User.MODERATOR
+        user.save(update_fields=['role'])
+        assert user.token_version == version + 1
+        user.save(update_fields=['bio'])
+        assert User.objects.get(pk=user.pk).token_version == version + 1
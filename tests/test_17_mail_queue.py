@@ -0,0 +1,67 @@
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+
+from mdb_users.mail_queue import MailQueue, mail_queue
+
+
+class FlakyBackend:
+    """Бэкенд, который падает на первых попытках открыть соединение."""
+
+    failures = 0
+    opened = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        FlakyBackend.opened += 1
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise ConnectionError('SMTP is down')
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def send_messages(self, messages):
+        mail.outbox.extend(messages)
+        return len(messages)
+
+
+@pytest.mark.django_db
+class Test17ConfirmationMailQueue:
+
+    SIGNUP_URL = '/api/v1/auth/signup/'
+
+    def test_01_signup_does_not_wait_for_delivery(self, client, settings):
+        settings.CONFIRMATION_EMAIL_ASYNC = True
+        outbox_before = len(mail.outbox)
+        for number in range(5):
+            response = client.post(self.SIGNUP_URL, data={
+                'username': f'user{number}',
+                'email': f'user{number}@yamdb.fake',
+            })
+            assert response.status_code == HTTPStatus.OK
+        assert mail_queue.flush(timeout=5)
+        assert len(mail.outbox) == outbox_before + 5
+
+    def test_02_batch_uses_one_connection_and_retries(self, monkeypatch):
+        queue = MailQueue(batch_size=10, max_retries=2, retry_delay=0)
+        monkeypatch.setattr(
+            'mdb_users.mail_queue.get_connection',
+            lambda **kwargs: FlakyBackend(),
+        )
+        FlakyBackend.failures, FlakyBackend.opened = 1, 0
+        messages = [
+            mail.EmailMessage('s', 'b', 'from@yamdb.fake', [f'{n}@y.fake'])
+            for n in range(3)
+        ]
+        outbox_before = len(mail.outbox)
+        queue.deliver(messages)
+        assert len(mail.outbox) == outbox_before + 3
+        assert FlakyBackend.opened == 2, (
+            'Пачка писем отправляется через одно соединение, а при ошибке '
+            'повторяется.'
+        )
@@ -0,0 +1,134 @@
+import re
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+import api_yamdb.constants as constants
+from mdb_users.models import ConfirmationCode
+from mdb_users.tokens import check_confirmation_code
+
+
+@pytest.mark.django_db
+class Test18ConfirmationCode:
+
+    SIGNUP_URL = '/api/v1/auth/signup/'
+    TOKEN_URL = '/api/v1/auth/token/'
+    DATA = {'username': 'coded_user', 'email': 'coded_user@yamdb.fake'}
+
+    def signup(self, client):
+        response = client.post(self.SIGNUP_URL, data=self.DATA)
+        assert response.status_code == HTTPStatus.OK
+        return re.search(
+            r'Ваш код подтверждения: (\S+)', mail.outbox[-1].body
+        ).group(1)
+
+    def get_token(self, client, code):
+        return client.post(self.TOKEN_URL, data={
+            'username': self.DATA['username'], 'confirmation_code': code
+        })
+
+    def test_01_only_hash_is_stored(self, client, django_user_model):
+        code = self.signup(client)
+        stored = ConfirmationCode.objects.get(
+            user__username=self.DATA['username']
+        )
+        assert stored.code_hash != code
+        assert stored.expires_at > timezone.now()
+        assert not hasattr(django_user_model, 'confirmation_code')
+
+        response = self.get_token(client, code)
+        assert response.status_code == HTTPStatus.OK
+        assert 'token' in response.json()
+
+    def test_02_repeat_signup_replaces_code(self, client,
+                                            django_user_model):
+        old_code = self.signup(client)
+        user = django_user_model.objects.get(
+            username=self.DATA['username']
+        )
+        new_code = self.signup(client)
+        assert ConfirmationCode.objects.count() == 1
+        user_after = django_user_model.objects.get(pk=user.pk)
+        assert user_after.password == user.password
+        assert self.get_token(client, old_code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        )
+        assert self.get_token(client, new_code).status_code == HTTPStatus.OK
+
+    def test_03_expired_code_rejected(self, client):
+        code = self.signup(client)
+        ConfirmationCode.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        response = self.get_token(client, code)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_attempts_limited(self, client, settings):
+        settings.CONFIRMATION_CODE_MAX_ATTEMPTS = 2
+        code = self.signup(client)
+        for _ in range(2):
+            assert self.get_token(client, 'wrong').status_code == (
+                HTTPStatus.BAD_REQUEST
+            )
+        assert ConfirmationCode.objects.get().attempts == 2
+        assert self.get_token(client, code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        )
+        # Новый код сбрасывает счётчик
+        code = self.signup(client)
+        assert self.get_token(client, code).status_code == HTTPStatus.OK
+
+    def test_05_single_lookup_on_token(self, client,
+                                       django_assert_num_queries):
+        code = self.signup(client)
+        # Выборка пользователя с кодом и DELETE кода в точке сохранения
+        with django_assert_num_queries(4):
+            response = self.get_token(client, code)
+        assert response.status_code == HTTPStatus.OK
+
+    def test_06_clear_expired_codes(self, client, admin, user):
+        self.signup(client)
+        ConfirmationCode.objects.bulk_create([
+            ConfirmationCode(
+                user=expired_user,
+                code_hash='0' * 64,
+                expires_at=timezone.now() - timedelta(minutes=1),
+            )
+            for expired_user in (admin, user)
+        ])
+        call_command('clear_confirmation_codes')
+        assert list(
+            ConfirmationCode.objects.values_list(
+                'user__username', flat=True
+            )
+        ) == [self.DATA['username']]
+
+    def test_07_code_is_single_use(self, client):
+        code = self.signup(client)
+        assert self.get_token(client, code).status_code == HTTPStatus.OK
+        assert not ConfirmationCode.objects.exists()
+        assert self.get_token(client, code).status_code == (
+            HTTPStatus.BAD_REQUEST
+        ), 'Код подтверждения должен действовать только один раз.'
+
+    def test_08_attempts_limit_is_conditional(self, client, settings,
+                                              django_user_model):
+        settings.CONFIRMATION_CODE_MAX_ATTEMPTS = 2
+        code = self.signup(client)
+        user = django_user_model.objects.select_related('confirmation').get(
+            username=self.DATA['username']
+        )
+        # Параллельные запросы успели израсходовать попытки после того,
+        # как этот прочитал код
+        ConfirmationCode.objects.update(attempts=2)
+        assert check_confirmation_code(user, 'wrong') == (
+            constants.USER_CONFIRMATION_ATTEMPTS_ERROR
+        )
+        assert check_confirmation_code(user, code) == (
+            constants.USER_WRONG_CONFIRMATION_CODE_ERROR
+        )
+        assert ConfirmationCode.objects.get().attempts == 2
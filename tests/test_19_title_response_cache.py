@@ -0,0 +1,133 @@
+import threading
+import time
+import uuid
+from http import HTTPStatus
+
+import pytest
+from rest_framework.response import Response
+
+from api.mixins import cached_response
+from reviews.models import Category, Genre, Title
+from tests.utils import create_catalog
+
+
+@pytest.mark.django_db
+class Test19TitleResponseCache:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_anonymous_list_cached(self, client,
+                                      django_assert_num_queries):
+        create_catalog(3)
+        response = client.get(self.TITLES_URL, {'genre': 'drama', 'page': 1})
+        assert response.json()['count'] == 3
+        with django_assert_num_queries(0):
+            cached = client.get(
+                self.TITLES_URL,
+                {'page': 1, 'genre': 'drama', 'utm_source': 'mail'},
+            )
+        assert cached.json() == response.json(), (
+            'Порядок параметров и параметры вне фильтров не должны '
+            'влиять на ключ кэша.'
+        )
+        assert client.get(
+            self.TITLES_URL, {'genre': 'missing'}
+        ).json()['count'] == 0
+
+    def test_02_authenticated_not_cached(self, user_client):
+        create_catalog(3)
+        user_client.get(self.TITLES_URL)
+        Title.objects.filter(name='Произведение 000').update(name='Скрыто')
+        names = [
+            item['name']
+            for item in user_client.get(self.TITLES_URL).json()['results']
+        ]
+        assert 'Скрыто' in names
+
+    def test_03_invalidation(self, client, admin_client, user_client):
+        create_catalog(2)
+        title = Title.objects.order_by('name').first()
+        detail_url = f'{self.TITLES_URL}{title.id}/'
+        client.get(self.TITLES_URL)
+        client.get(detail_url)
+
+        user_client.post(
+            f'{detail_url}reviews/', data={'text': 'Отзыв', 'score': 6}
+        )
+        assert client.get(detail_url).json()['rating'] == 6
+        assert client.get(self.TITLES_URL).json()['results'][0][
+            'rating'
+        ] == 6
+
+        Genre.objects.filter(slug='drama').update(name='Драма!')
+        Genre.objects.get(slug='drama').save()
+        assert 'Драма!' in [
+            genre['name'] for genre in client.get(detail_url).json()['genre']
+        ]
+
+        Category.objects.get(slug='films').save()
+        admin_client.patch(detail_url, data={'name': 'Новое имя'})
+        assert client.get(detail_url).json()['name'] == 'Новое имя'
+
+    def test_04_errors_not_cached(self, client):
+        assert client.get(
+            f'{self.TITLES_URL}1/'
+        ).status_code == HTTPStatus.NOT_FOUND
+        create_catalog(1)
+        title_id = Title.objects.get().id
+        assert client.get(
+            f'{self.TITLES_URL}{title_id}/'
+        ).status_code == HTTPStatus.OK
+
+    # Больше одной страницы (PAGE_SIZE = 20), чтобы была ссылка next
+    PAGED_SIZE = 21
+
+    def test_05_links_carry_no_foreign_params(self, client):
+        create_catalog(self.PAGED_SIZE)
+        params = {'genre': 'drama'}
+        first = client.get(
+            self.TITLES_URL, {**params, 'utm_source': 'mail'}
+        ).json()
+        assert 'utm_source' not in first['next'], (
+            'Параметры вне фильтров не должны попадать в закэшированные '
+            'ссылки пагинации.'
+        )
+        assert 'genre=drama' in first['next']
+        assert client.get(self.TITLES_URL, params).json() == first
+
+    def test_06_scheme_in_cache_key(self, client):
+        create_catalog(self.PAGED_SIZE)
+        http = client.get(self.TITLES_URL).json()
+        https = client.get(self.TITLES_URL, secure=True).json()
+        assert http['next'].startswith('http://')
+        assert https['next'].startswith('https://'), (
+            'Ответ по HTTP не должен отдаваться клиентам HTTPS.'
+        )
+
+
+class Test19ResponseCacheCoalescing:
+
+    def test_01_concurrent_misses_build_once(self):
+        key = f'test:{uuid.uuid4()}'
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            time.sleep(0.05)
+            return Response({'ok': True})
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cached_response(key, handler, None).data
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert results == [{'ok': True}] * 8
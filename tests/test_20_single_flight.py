@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+
+from api_yamdb.singleflight import SingleFlight
+
+
+class Test20SingleFlight:
+
+    KEY = 'test:single-flight'
+
+    @pytest.fixture
+    def flight(self):
+        return SingleFlight(
+            lease_timeout=5, wait_timeout=0.3, stale_timeout=60,
+            poll_interval=0.01,
+        )
+
+    @staticmethod
+    def builder(value):
+        calls = []
+
+        def build():
+            calls.append(value)
+            return value
+        return build, calls
+
+    def test_01_fresh_value_not_rebuilt(self, flight):
+        flight.store(self.KEY, 'cached', timeout=60)
+        build, calls = self.builder('new')
+        assert flight.get_or_build(self.KEY, build, 60) == 'cached'
+        assert not calls
+
+    def test_02_stale_served_while_other_worker_rebuilds(self, flight):
+        flight.store(self.KEY, 'stale', timeout=0)
+        assert flight.acquire_lease(self.KEY) is not None
+        build, calls = self.builder('new')
+        assert flight.get_or_build(self.KEY, build, 60) == 'stale'
+        assert not calls
+
+    def test_03_stale_refreshed_by_lease_holder(self, flight):
+        flight.store(self.KEY, 'stale', timeout=0)
+        build, calls = self.builder('new')
+        assert flight.get_or_build(self.KEY, build, 60) == 'new'
+        assert calls == ['new']
+        assert cache.get(flight.lease_key(self.KEY)) is None
+        assert flight.get_or_build(self.KEY, build, 60) == 'new'
+        assert calls == ['new']
+
+    def test_04_miss_waits_for_other_worker(self, flight):
+        token = flight.acquire_lease(self.KEY)
+
+        def other_worker():
+            time.sleep(0.05)
+            flight.store(self.KEY, 'built elsewhere', timeout=60)
+            flight.release_lease(self.KEY, token)
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        build, calls = self.builder('new')
+        assert flight.get_or_build(self.KEY, build, 60) == 'built elsewhere'
+        thread.join()
+        assert not calls
+
+    def test_05_miss_builds_after_wait_timeout(self, flight):
+        assert flight.acquire_lease(self.KEY) is not None
+        build, calls = self.builder('new')
+        assert flight.get_or_build(self.KEY, build, 60) == 'new'
+        assert calls == ['new']
+
+    def test_06_concurrent_misses_in_process(self, flight):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    flight.get_or_build(self.KEY, build, 60)
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1
+        assert results == ['value'] * 8
+
+    def test_07_failed_build_releases_lease(self, flight):
+        def build():
+            raise RuntimeError('boom')
+
+        with pytest.raises(RuntimeError):
+            flight.get_or_build(self.KEY, build, 60)
+        assert cache.get(flight.lease_key(self.KEY)) is None
+        assert flight.key_locks.locks == {}
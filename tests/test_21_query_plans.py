@@ -0,0 +1,102 @@
+import re
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from reviews.models import Comment, Review, Title
+from tests.utils import create_catalog
+
+User = get_user_model()
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor != 'sqlite',
+    reason='Снимки планов сняты для SQLite',
+)
+
+
+def titles():
+    return Title.objects.select_related('category').order_by('name')
+
+
+# Горячие запросы и ожидаемые планы (EXPLAIN QUERY PLAN без номеров узлов)
+PLAN_SNAPSHOTS = {
+    'title_list': (
+        lambda: titles()[:20],
+        [
+            'SCAN reviews_title USING INDEX title_name_idx',
+            'SEARCH reviews_category USING INTEGER PRIMARY KEY (rowid=?) '
+            'LEFT-JOIN',
+        ],
+    ),
+    'title_by_year': (
+        lambda: titles().filter(year=2000)[:20],
+        [
+            'SEARCH reviews_title USING INDEX title_year_name_idx (year=?)',
+            'SEARCH reviews_category USING INTEGER PRIMARY KEY (rowid=?) '
+            'LEFT-JOIN',
+        ],
+    ),
+    'title_by_category': (
+        lambda: titles().filter(category__slug='films')[:20],
+        [
+            'SEARCH reviews_category USING INDEX '
+            'sqlite_autoindex_reviews_category_1 (slug=?)',
+            'SEARCH reviews_title USING INDEX title_category_name_idx '
+            '(category_id=?)',
+        ],
+    ),
+    'review_list': (
+        lambda: Review.objects.select_related('author').filter(
+            title_id=1
+        )[:20],
+        [
+            'SEARCH reviews_review USING INDEX review_title_pub_date_idx '
+            '(title_id=?)',
+            'SEARCH mdb_users_user USING INTEGER PRIMARY KEY (rowid=?)',
+        ],
+    ),
+    'comment_list': (
+        lambda: Comment.objects.select_related('author').filter(
+            review_id=1, review__title_id=1
+        )[:20],
+        [
+            'SEARCH reviews_review USING INTEGER PRIMARY KEY (rowid=?)',
+            'SEARCH reviews_comment USING INDEX comment_review_pub_date_idx '
+            '(review_id=?)',
+            'SEARCH mdb_users_user USING INTEGER PRIMARY KEY (rowid=?)',
+        ],
+    ),
+    # username уникален, его индекс уже задаёт порядок списка; поиск
+    # подстроки (icontains) индексом не ускорить
+    'user_list': (
+        lambda: User.objects.order_by('username')[:20],
+        [
+            'SCAN mdb_users_user USING INDEX '
+            'sqlite_autoindex_mdb_users_user_1',
+        ],
+    ),
+}
+
+
+def query_plan(queryset):
+    return [
+        re.sub(r'^\d+ \d+ \d+ ', '', line)
+        for line in queryset.explain().splitlines()
+    ]
+
+
+@pytest.mark.django_db
+class Test21QueryPlans:
+
+    @pytest.mark.parametrize('name', PLAN_SNAPSHOTS)
+    def test_01_plan_snapshot(self, name):
+        create_catalog(3)
+        build_queryset, expected = PLAN_SNAPSHOTS[name]
+        plan = query_plan(build_queryset())
+        assert plan == expected, (
+            f'План запроса `{name}` изменился:\n' + '\n'.join(plan)
+        )
+        assert not any('TEMP B-TREE' in line for line in plan), (
+            f'Запрос `{name}` сортирует результат без индекса.'
+        )
@@ -0,0 +1,115 @@
+import os
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from api.filters import TitleFilter
+from reviews.models import Category, Genre, Title
+from reviews.search import (build_match_expression, normalize_text,
+                            title_index)
+from tests.conftest import MANAGE_PATH
+
+DATA_PATH = os.path.join(MANAGE_PATH, 'static', 'data', '')
+TITLES_URL = '/api/v1/titles/'
+
+
+def search(client, query, **params):
+    response = client.get(TITLES_URL, {'search': query, **params})
+    assert response.status_code == HTTPStatus.OK
+    return [item['name'] for item in response.json()['results']]
+
+
+class Test22SearchNormalization:
+
+    def test_01_normalize_text(self):
+        assert normalize_text('Звёздные ВОЙНЫ') == 'звездные войны'
+
+    def test_02_match_expression(self):
+        assert build_match_expression('Ёжик, "в" тумане!') == (
+            '"ежик"* "в"* "тумане"*'
+        )
+        assert build_match_expression('?!') == ''
+
+
+@pytest.mark.django_db
+class Test22TitleSearch:
+
+    @pytest.fixture
+    def titles(self):
+        category = Category.objects.create(name='Фильм', slug='films')
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        names = {
+            'Ёжик в тумане': 'Мультфильм о ёжике и тумане',
+            'Звёздные войны': 'Космическая сага',
+            'Война и мир': 'Роман-эпопея',
+            'Туманность Андромеды': 'Фантастика, звёздные войны далёкого '
+                                    'будущего',
+        }
+        created = {}
+        for name, description in names.items():
+            title = Title.objects.create(
+                name=name, description=description, year=1970,
+                category=category,
+            )
+            created[name] = title
+        created['Война и мир'].genre.set([drama])
+        return created
+
+    def test_01_case_and_yo_folding(self, client, titles):
+        assert search(client, 'ежик') == ['Ёжик в тумане']
+        assert search(client, 'ЁЖИК') == ['Ёжик в тумане']
+        assert search(client, 'звездные') == [
+            'Звёздные войны', 'Туманность Андромеды'
+        ], 'Совпадение в названии должно ранжироваться выше описания.'
+
+    def test_02_prefix_and_all_words(self, client, titles):
+        assert set(search(client, 'войн')) == {
+            'Звёздные войны', 'Война и мир', 'Туманность Андромеды'
+        }
+        assert search(client, 'туман ежик') == ['Ёжик в тумане']
+        assert search(client, '!!!') == []
+
+    def test_03_combines_with_filters(self, client, titles):
+        assert search(client, 'войн', genre='drama') == ['Война и мир']
+
+    def test_04_index_follows_writes(self, client, titles):
+        title = titles['Война и мир']
+        title.name = 'Анна Каренина'
+        title.save()
+        assert search(client, 'каренина') == ['Анна Каренина']
+        assert 'Анна Каренина' not in search(client, 'война')
+        title.delete()
+        assert search(client, 'каренина') == []
+
+    def test_05_search_uses_index(self, client, titles,
+                                  django_assert_num_queries):
+        queryset = Title.objects.all()
+        plan = TitleFilter(
+            {'search': 'война'}, queryset=queryset
+        ).qs.explain()
+        assert 'VIRTUAL TABLE' in plan
+        # COUNT, страница произведений с категорией, prefetch жанров
+        with django_assert_num_queries(3):
+            search(client, 'война')
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22SearchAfterLoadData:
+
+    def test_01_loaded_titles_searchable(self, client, tmp_path):
+        call_command(
+            'load_data',
+            f'--path={DATA_PATH}',
+            f'--checkpoint={tmp_path / "checkpoint.json"}',
+            stdout=StringIO(),
+        )
+        assert search(client, 'звездные') == [
+            'Звёздные войны. Эпизод 5: Империя наносит ответный удар'
+        ]
+        call_command('flush', '--no-input')
+        assert title_index.is_in_sync(), (
+            'После flush индекс должен очищаться вместе с таблицами.'
+        )
+        assert not title_index.filter(Title.objects.all(), 'звездные')
@@ -0,0 +1,159 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, Review, Title
+from reviews.search import comment_index, review_index
+from tests.utils import create_catalog
+
+REVIEWS_SEARCH_URL = '/api/v1/search/reviews/'
+COMMENTS_SEARCH_URL = '/api/v1/search/comments/'
+
+
+@pytest.fixture
+def reviews_tree(user, admin, moderator):
+    create_catalog(2)
+    first, second = Title.objects.order_by('name')
+    reviews = {
+        'first_user': first.reviews.create(
+            author=user, score=8, text='Отличный ёмкий сюжет'
+        ),
+        'first_admin': first.reviews.create(
+            author=admin, score=5, text='Сюжет затянут, актёры хороши'
+        ),
+        'second_user': second.reviews.create(
+            author=user, score=9, text='Великолепная музыка'
+        ),
+    }
+    reviews['first_user'].comments.create(
+        author=moderator, text='Согласен, сюжет ёмкий'
+    )
+    reviews['second_user'].comments.create(
+        author=admin, text='Музыка и правда хороша'
+    )
+    return first, second, reviews
+
+
+def texts(response):
+    assert response.status_code == HTTPStatus.OK
+    return {item['text'] for item in response.json()['results']}
+
+
+@pytest.mark.django_db
+class Test23ReviewSearch:
+
+    def test_01_review_search(self, client, reviews_tree):
+        first, second, reviews = reviews_tree
+        assert texts(client.get(REVIEWS_SEARCH_URL, {'q': 'СЮЖЕТ'})) == {
+            reviews['first_user'].text, reviews['first_admin'].text
+        }
+        assert texts(client.get(REVIEWS_SEARCH_URL, {'q': 'емкий'})) == {
+            reviews['first_user'].text
+        }
+        assert texts(client.get(
+            REVIEWS_SEARCH_URL, {'q': 'сюжет', 'author': 'TestAdmin'}
+        )) == {reviews['first_admin'].text}
+        assert texts(client.get(
+            REVIEWS_SEARCH_URL, {'q': 'хорош', 'title': second.id}
+        )) == set()
+
+    def test_02_review_search_response(self, client, reviews_tree):
+        first, _, reviews = reviews_tree
+        response = client.get(REVIEWS_SEARCH_URL, {'q': 'сюжет'})
+        data = response.json()
+        assert set(data) == {'next', 'previous', 'results'}, (
+            'Поиск должен отдаваться курсорной пагинацией без count.'
+        )
+        assert [item['id'] for item in data['results']] == [
+            reviews['first_admin'].id, reviews['first_user'].id
+        ]
+        assert data['results'][0]['title'] == first.id
+
+    def test_03_q_required(self, client):
+        assert client.get(
+            REVIEWS_SEARCH_URL
+        ).status_code == HTTPStatus.BAD_REQUEST
+        assert client.get(
+            COMMENTS_SEARCH_URL
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_04_comment_search(self, client, reviews_tree):
+        first, second, reviews = reviews_tree
+        response = client.get(COMMENTS_SEARCH_URL, {'q': 'ёмкий'})
+        assert texts(response) == {'Согласен, сюжет ёмкий'}
+        item = response.json()['results'][0]
+        assert (item['review'], item['title']) == (
+            reviews['first_user'].id, first.id
+        )
+        assert texts(client.get(
+            COMMENTS_SEARCH_URL, {'q': 'музыка', 'title': first.id}
+        )) == set()
+        assert texts(client.get(
+            COMMENTS_SEARCH_URL, {'q': 'музыка', 'author': 'TestAdmin'}
+        )) == {'Музыка и правда хороша'}
+
+    def test_05_index_follows_writes(self, client, reviews_tree):
+        first, _, reviews = reviews_tree
+        review = reviews['second_user']
+        review.text = 'Скучный саундтрек'
+        review.save()
+        assert texts(client.get(REVIEWS_SEARCH_URL, {'q': 'саундтрек'})) == {
+            'Скучный саундтрек'
+        }
+        response = client.get(REVIEWS_SEARCH_URL, {'q': 'великолепная'})
+        assert texts(response) == set()
+        first.delete()
+        assert review_index.is_in_sync()
+        assert comment_index.is_in_sync()
+        assert texts(client.get(COMMENTS_SEARCH_URL, {'q': 'сюжет'})) == set()
+
+    def test_06_search_uses_index(self, reviews_tree):
+        plan = Review.objects.filter(review_index.match('сюжет')).explain()
+        assert 'VIRTUAL TABLE' in plan
+        plan = Comment.objects.filter(comment_index.match('сюжет')).explain()
+        assert 'VIRTUAL TABLE' in plan
+
+    def test_07_comment_search_reads_no_review_row(self, client,
+                                                   reviews_tree):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(COMMENTS_SEARCH_URL, {'q': 'ёмкий'})
+        assert response.json()['results'][0]['title'] == reviews_tree[0].id
+        assert not any(
+            '"reviews_review"."text"' in query['sql']
+            for query in context.captured_queries
+        ), 'Для поля title не нужно загружать отзыв целиком.'
+
+
+@pytest.mark.django_db
+class Test23AdminSearch:
+
+    @pytest.fixture
+    def admin_site_client(self, user_superuser):
+        client = Client()
+        client.force_login(user_superuser)
+        return client
+
+    def test_01_review_admin_search(self, admin_site_client, reviews_tree):
+        _, _, reviews = reviews_tree
+        for term, expected in (
+            ('сюжет', 2),
+            ('ЕМКИЙ', 1),
+            ('TestAdmin', 1),
+            ('Произведение 001', 1),
+        ):
+            response = admin_site_client.get(
+                '/admin/reviews/review/', {'q': term}
+            )
+            assert response.status_code == HTTPStatus.OK
+            assert response.context['cl'].result_count == expected, term
+
+    def test_02_comment_admin_search(self, admin_site_client, reviews_tree):
+        for term, expected in (('ёмкий', 1), ('великолепная', 1)):
+            response = admin_site_client.get(
+                '/admin/reviews/comment/', {'q': term}
+            )
+            assert response.status_code == HTTPStatus.OK
+            assert response.context['cl'].result_count == expected, term
@@ -0,0 +1,200 @@
+import math
+from http import HTTPStatus
+
+import pytest
+
+from api.autocomplete import PrefixIndex, catalog_autocomplete
+from api_yamdb import versions
+from reviews.models import Category, Genre, Title
+
+AUTOCOMPLETE_URL = '/api/v1/autocomplete/'
+
+
+@pytest.fixture(autouse=True)
+def fresh_autocomplete(monkeypatch):
+    """Каждый тест начинает без индекса; фоновая пересборка в тестах
+    выполняется сразу: поток не увидел бы данных из транзакции теста."""
+    monkeypatch.setattr(catalog_autocomplete, 'indexes', None)
+    monkeypatch.setattr(catalog_autocomplete, 'version', None)
+    monkeypatch.setattr(
+        catalog_autocomplete, 'rebuild_in_background',
+        catalog_autocomplete.rebuild,
+    )
+
+
+@pytest.fixture
+def catalog():
+    category = Category.objects.create(name='Фильм', slug='movie')
+    Category.objects.create(name='Книга', slug='book')
+    Genre.objects.create(name='Фантастика', slug='sci-fi')
+    Genre.objects.create(name='Драма', slug='drama')
+    for name in (
+        'Звёздные войны', 'Звёздный путь', 'Война и мир', 'Фарго',
+    ):
+        Title.objects.create(name=name, year=1980, category=category)
+
+
+def names(response, group):
+    assert response.status_code == HTTPStatus.OK
+    return [item['name'] for item in response.json()[group]]
+
+
+@pytest.mark.django_db
+class Test24Autocomplete:
+
+    def test_01_prefix_matches(self, client, catalog):
+        response = client.get(AUTOCOMPLETE_URL, {'q': 'ЗВЕЗ'})
+        assert names(response, 'titles') == [
+            'Звёздные войны', 'Звёздный путь'
+        ]
+        assert response.json()['genres'] == []
+        response = client.get(AUTOCOMPLETE_URL, {'q': 'вой'})
+        assert names(response, 'titles') == [
+            'Война и мир', 'Звёздные войны'
+        ], (
+            'Совпадения с начала названия должны идти раньше совпадений '
+            'со следующих слов.'
+        )
+        response = client.get(AUTOCOMPLETE_URL, {'q': 'фа'})
+        assert names(response, 'titles') == ['Фарго']
+        assert response.json()['genres'] == [
+            {'slug': 'sci-fi', 'name': 'Фантастика'}
+        ]
+        assert names(
+            client.get(AUTOCOMPLETE_URL, {'q': 'кни'}), 'categories'
+        ) == ['Книга']
+
+    def test_02_limit_and_validation(self, client, catalog):
+        response = client.get(AUTOCOMPLETE_URL, {'q': 'звезд', 'limit': 1})
+        assert names(response, 'titles') == ['Звёздные войны']
+        assert client.get(
+            AUTOCOMPLETE_URL, {'q': 'а', 'limit': 0}
+        ).status_code == HTTPStatus.BAD_REQUEST
+        assert client.get(
+            AUTOCOMPLETE_URL
+        ).status_code == HTTPStatus.BAD_REQUEST
+        assert client.get(AUTOCOMPLETE_URL, {'q': '  '}).json() == {
+            'titles': [], 'genres': [], 'categories': []
+        }
+
+    def test_03_no_queries_once_built(self, client, catalog,
+                                      django_assert_num_queries):
+        client.get(AUTOCOMPLETE_URL, {'q': 'з'})
+        with django_assert_num_queries(0):
+            response = client.get(AUTOCOMPLETE_URL, {'q': 'звёздн'})
+        assert len(names(response, 'titles')) == 2
+
+    def test_04_follows_catalog_changes(self, client, catalog):
+        assert names(client.get(AUTOCOMPLETE_URL, {'q': 'зв'}), 'titles')
+        title = Title.objects.get(name='Звёздный путь')
+        title.name = 'Путь домой'
+        title.save()
+        Genre.objects.create(name='Звуковое кино', slug='sound')
+        response = client.get(AUTOCOMPLETE_URL, {'q': 'зв'})
+        assert names(response, 'titles') == ['Звёздные войны']
+        assert names(response, 'genres') == ['Звуковое кино']
+        Category.objects.filter(slug='book').delete()
+        assert client.get(
+            AUTOCOMPLETE_URL, {'q': 'кни'}
+        ).json()['categories'] == []
+
+    def test_05_local_changes_without_rebuild(
+            self, client, catalog, monkeypatch, django_assert_num_queries):
+        client.get(AUTOCOMPLETE_URL, {'q': 'з'})
+        rebuilds = []
+        monkeypatch.setattr(
+            catalog_autocomplete, 'rebuild_in_background',
+            lambda: rebuilds.append(True),
+        )
+        title = Title.objects.get(name='Фарго')
+        title.name = 'Зодиак'
+        title.save()
+        genre = Genre.objects.get(slug='drama')
+        genre.slug = 'drama-new'
+        genre.save()
+        Category.objects.get(slug='book').delete()
+        # Пересборка только запрошена, ответ собран из прежнего индекса
+        # с внесёнными на месте изменениями
+        with django_assert_num_queries(0):
+            response = client.get(AUTOCOMPLETE_URL, {'q': 'з'})
+            genres = client.get(AUTOCOMPLETE_URL, {'q': 'др'}).json()
+            books = client.get(AUTOCOMPLETE_URL, {'q': 'кни'}).json()
+        assert names(response, 'titles') == [
+            'Звёздные войны', 'Звёздный путь', 'Зодиак'
+        ]
+        assert genres['genres'] == [{'slug': 'drama-new', 'name': 'Драма'}]
+        assert books['categories'] == []
+        assert rebuilds, (
+            'Смена версии каталога должна запускать пересборку в фоне.'
+        )
+
+
+class CountingKeys(list):
+    """Список ключей, который считает обращения к элементам."""
+
+    reads = 0
+
+    def __getitem__(self, position):
+        self.reads += 1
+        return super().__getitem__(position)
+
+
+class Test24PrefixIndex:
+
+    LIMIT = 10
+
+    def test_01_lookup_reads_few_keys(self):
+        index = PrefixIndex(
+            (f'Произведение номер {number} часть {number % 7}', number, {})
+            for number in range(50000)
+        )
+        index.groups = [
+            (CountingKeys(keys), entries) for keys, entries in index.groups
+        ]
+        counters = [keys for keys, _ in index.groups]
+        # Двоичный поиск в каждой группе и не больше limit + 1 ключей
+        # подряд после найденной позиции
+        bound = sum(
+            math.ceil(math.log2(len(keys))) + 1 + self.LIMIT + 1
+            for keys in counters
+        )
+        for query in ('произв', 'номер 4', 'часть 3', 'нет такого'):
+            for keys in counters:
+                keys.reads = 0
+            index.search(query, self.LIMIT)
+            reads = sum(keys.reads for keys in counters)
+            assert reads <= bound, (
+                f'Подсказка по «{query}» прочитала {reads} ключей, '
+                f'ожидалось не больше {bound}.'
+            )
+
+    def test_02_updates_match_full_build(self):
+        items = {
+            number: (f'Книга {number} том {number % 3}', number, {})
+            for number in range(200)
+        }
+        index = PrefixIndex(list(items.values())[:100])
+        for item in list(items.values())[100:]:
+            index.add(*item)
+        for number in range(0, 200, 7):
+            index.remove(number)
+            del items[number]
+        for number in range(1, 200, 11):
+            if number in items:
+                items[number] = (f'Другая {number}', number, {})
+                index.add(*items[number])
+        expected = PrefixIndex(items.values())
+        assert index.groups == expected.groups
+        assert index.keys_by_ident == expected.keys_by_ident
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24CatalogVersion:
+
+    def test_01_single_bump_outside_transaction(self, monkeypatch):
+        bumped = []
+        monkeypatch.setattr(versions, '_set_new_version', bumped.append)
+        Title.objects.create(name='Фарго', year=1996)
+        assert bumped.count(versions.CATALOG) == 1, (
+            'Запись вне транзакции должна менять версию каталога один раз.'
+        )
@@ -0,0 +1,137 @@
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.http import QueryDict
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filters import TitleFilter
+from api.views import TitleViewSet
+from api_yamdb.versions import CATALOG, REVIEWS
+from reviews.models import Category, Genre, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def filtered(client, **params):
+    response = client.get(TITLES_URL, params)
+    assert response.status_code == HTTPStatus.OK, response.json()
+    data = response.json()
+    names = [item['name'] for item in data['results']]
+    assert data['count'] == len(names)
+    return names
+
+
+@pytest.mark.django_db
+class Test25TitleFilters:
+
+    @pytest.fixture
+    def titles(self):
+        category = Category.objects.create(name='Фильм', slug='films')
+        drama, comedy, horror = (
+            Genre.objects.create(name=name, slug=slug)
+            for name, slug in (
+                ('Драма', 'drama'), ('Комедия', 'comedy'),
+                ('Ужасы', 'horror'),
+            )
+        )
+        catalog = (
+            ('Драма', 1990, 8.5, [drama]),
+            ('Комедия', 2000, 6.0, [comedy]),
+            ('Трагикомедия', 2010, 7.0, [drama, comedy]),
+            ('Хоррор', 2020, None, [horror]),
+        )
+        for name, year, rating, genres in catalog:
+            title = Title.objects.create(
+                name=name, year=year, rating=rating, category=category
+            )
+            title.genre.set(genres)
+
+    def test_01_single_genre(self, client, titles):
+        assert filtered(client, genre='drama') == ['Драма', 'Трагикомедия']
+
+    def test_02_any_genre_without_duplicates(self, client, titles):
+        assert filtered(client, genre='drama,comedy') == [
+            'Драма', 'Комедия', 'Трагикомедия'
+        ]
+        assert filtered(client, genre='drama, comedy,', genre_mode='any') == [
+            'Драма', 'Комедия', 'Трагикомедия'
+        ]
+
+    def test_03_all_genres(self, client, titles):
+        assert filtered(client, genre='drama,comedy', genre_mode='all') == [
+            'Трагикомедия'
+        ]
+        assert filtered(
+            client, genre='drama,comedy,horror', genre_mode='all'
+        ) == []
+
+    def test_04_unknown_genre_mode(self, client, titles):
+        response = client.get(
+            TITLES_URL, {'genre': 'drama', 'genre_mode': 'some'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_05_year_range(self, client, titles):
+        assert filtered(client, year_min=2000, year_max=2010) == [
+            'Комедия', 'Трагикомедия'
+        ]
+        assert filtered(client, year_min=2011) == ['Хоррор']
+
+    def test_06_rating_range(self, client, titles):
+        assert filtered(client, rating_min=6.5) == ['Драма', 'Трагикомедия']
+        assert filtered(client, rating_min=6, rating_max=7) == [
+            'Комедия', 'Трагикомедия'
+        ]
+
+    def test_07_combined(self, client, titles):
+        assert filtered(
+            client, genre='drama,comedy', year_min=2000, rating_min=6.5
+        ) == ['Трагикомедия']
+
+    def test_08_each_title_once(self, titles, django_assert_num_queries):
+        for params, expected in (
+            ('genre=drama', ['Драма', 'Трагикомедия']),
+            ('genre=drama,comedy', ['Драма', 'Комедия', 'Трагикомедия']),
+            ('genre=drama,comedy&genre_mode=all', ['Трагикомедия']),
+            ('genre=drama,drama,comedy&genre_mode=all', ['Трагикомедия']),
+            ('genre=drama&genre_mode=all', ['Драма', 'Трагикомедия']),
+        ):
+            queryset = TitleFilter(
+                QueryDict(params), queryset=Title.objects.order_by('name')
+            ).qs
+            with django_assert_num_queries(1):
+                names = list(queryset.values_list('name', flat=True))
+            assert names == expected, params
+            assert queryset.count() == len(expected), params
+
+    def test_09_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_title_filters', titles=200, genres=5, repeat=1,
+            stdout=out,
+        )
+        output = out.getvalue()
+        assert 'genre any-of' in output
+        assert 'COUNT DIFFERS' not in output
+        assert not Title.objects.exists()
+        assert not Genre.objects.exists()
+
+    def test_10_genre_mode_requires_genre(self, client, titles):
+        response = client.get(TITLES_URL, {'genre_mode': 'all'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'genre_mode' in response.json()
+
+    def test_11_count_depends_on_reviews_only_with_rating(self):
+        view = TitleViewSet()
+        factory = APIRequestFactory()
+        for params, expected in (
+            ({}, (CATALOG,)),
+            ({'genre': 'drama', 'year_min': 2000}, (CATALOG,)),
+            ({'rating_min': 5}, (CATALOG, REVIEWS)),
+            ({'rating_max': 7}, (CATALOG, REVIEWS)),
+        ):
+            request = Request(factory.get(TITLES_URL, params))
+            assert view.get_count_versions(request) == expected, params
@@ -1,5 +1,7 @@
 from http import HTTPStatus
 
+from reviews.models import Category, Genre, Title
+
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +307,17 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+def create_catalog(size):
+    category = Category.objects.create(name='Фильм', slug='films')
+    genres = [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+    ]
+    for number in range(size):
+        title = Title.objects.create(
+            name=f'Произведение {number:03}', year=2000, category=category
+        )
+        title.genre.set(genres)
+    return category, genres